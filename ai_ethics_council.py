@@ -2,9 +2,14 @@
 
 # quantum_entanglement_communication_receiver_protocols.py
 
-from qiskit import Aer, QuantumCircuit, QuantumRegister, ClassicalRegister, execute
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
 from qiskit.extensions import Initialize
 
+from instrumentation import INFO, get_event_logger
+from quantum_execution import default_service
+
+_events = get_event_logger("ai_ethics_council")
+
 # Function to initialize the quantum state for entanglement
 def initialize_entangled_state():
     qr = QuantumRegister(2, name="q")  # Quantum Register with 2 qubits
@@ -24,26 +29,25 @@ def initialize_entangled_state():
 
     return circuit
 
-def receive_entangled_bits(num_bits):
-    backend = Aer.get_backend('qasm_simulator')  # Use Aer simulator for execution
+def stream_entangled_bits(num_bits, block_size=65536):
+    # Run the circuit once per block with one shot per bit and yield the per-shot outcomes
     circuit = initialize_entangled_state()
-    results = []
-
-    for _ in range(num_bits):
-        job = execute(circuit, backend, shots=1)
-        result = job.result()
-        counts = result.get_counts(circuit)
+    remaining = num_bits
+
+    while remaining > 0:
+        shots = min(block_size, remaining)
+        job = default_service.run(circuit, 'qasm_simulator', shots=shots, memory=True)
+        for outcome in job.result().get_memory(circuit):
+            if outcome == '0':
+                yield 0
+            elif outcome == '1':
+                yield 1
+            else:
+                raise ValueError("Error: No valid measurement result.")
+        remaining -= shots
 
-        if '0' in counts:
-            received_bit = 0
-        elif '1' in counts:
-            received_bit = 1
-        else:
-            raise ValueError("Error: No valid measurement result.")
-
-        results.append(received_bit)
-
-    return results
+def receive_entangled_bits(num_bits):
+    return list(stream_entangled_bits(num_bits))
 
 if __name__ == "__main__":
     try:
@@ -67,27 +71,28 @@ class AIEthicsCouncil:
 
     def review_ai_projects(self, projects):
         """Review AI projects for ethical compliance and potential risks."""
-        print(f"Conducting AI project review by {self.council_name}...")
+        _events.info("review", "Conducting AI project review by %(council)s...", council=self.council_name)
         for project in projects:
             # Perform ethics evaluation and risk assessment for each AI project
             self._evaluate_ethics_and_risks(project)
 
     def _evaluate_ethics_and_risks(self, project):
         """Private method to evaluate ethics and risks of an AI project."""
-        print(f"Evaluating ethics and risks of {project}...")
+        _events.info("evaluate", "Evaluating ethics and risks of %(project)s...", project=project)
         # Conduct ethics evaluation and risk assessment
         # Simulated function for demonstration purposes
         ethics_compliant = True
         potential_risks = ["Privacy Concerns", "Bias in Data", "Autonomous Decision Making"]
 
         if ethics_compliant:
-            print(f"{project} is compliant with ethics guidelines.")
+            _events.info("compliant", "%(project)s is compliant with ethics guidelines.", project=project)
         else:
-            print(f"{project} raises ethical concerns and requires further review.")
+            _events.warning("concerns", "%(project)s raises ethical concerns and requires further review.", project=project)
 
-        print("Potential risks identified:")
-        for risk in potential_risks:
-            print(f"- {risk}")
+        if _events.enabled_for(INFO):
+            listing = "\n".join(f"- {risk}" for risk in potential_risks)
+            _events.info("risks", "Potential risks identified:\n%(listing)s", listing=listing,
+                         project=project, risks=potential_risks)
 
 # Example usage:
 if __name__ == "__main__":
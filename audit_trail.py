@@ -1,10 +1,783 @@
 # audit_trail.py - Audit Trail Module
 
 import datetime
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from instrumentation import get_event_logger
+
+_events = get_event_logger("audit_trail")
+
+# Naive epoch matching the naive local timestamps of audit events
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def _matches(event, event_type, user, since, until):
+    if event_type is not None and event["event_type"] != event_type:
+        return False
+    if user is not None and event["user"] != user:
+        return False
+    if since is not None and event["timestamp"] < since:
+        return False
+    if until is not None and event["timestamp"] >= until:
+        return False
+    return True
+
+
+class MemoryEventLog:
+    """
+    In-memory audit event log with indexes by event type and user.
+
+    Each index maps a value to the ascending positions of its events, so a
+    query only visits candidate events. Time-range queries bisect the
+    timestamp column while events arrive in chronological order.
+    """
 
-class AuditTrail:
     def __init__(self):
-        self.audit_log = []
+        self.events = []
+        self._timestamps = []
+        self._by_event_type = {}
+        self._by_user = {}
+        self._chronological = True
+
+    def append(self, event):
+        position = len(self.events)
+        timestamp = event["timestamp"]
+        if self._timestamps and timestamp < self._timestamps[-1]:
+            self._chronological = False
+        self.events.append(event)
+        self._timestamps.append(timestamp)
+        self._by_event_type.setdefault(event["event_type"], []).append(position)
+        self._by_user.setdefault(event["user"], []).append(position)
+
+    def append_many(self, events):
+        for event in events:
+            self.append(event)
+
+    def query(self, event_type=None, user=None, since=None, until=None):
+        if event_type is None and user is None and since is None and until is None:
+            return self.events
+        if self._chronological:
+            low = 0 if since is None else bisect_left(self._timestamps, since)
+            high = len(self._timestamps) if until is None else bisect_left(self._timestamps, until)
+        else:
+            low, high = 0, len(self.events)
+
+        candidates = None
+        for index, value in ((self._by_event_type, event_type), (self._by_user, user)):
+            if value is None:
+                continue
+            positions = index.get(value, [])
+            # Index positions are ascending, so the time window is a slice of them
+            positions = positions[bisect_left(positions, low):bisect_left(positions, high)]
+            if candidates is None or len(positions) < len(candidates):
+                candidates = positions
+        if candidates is None:
+            candidates = range(low, high)
+        return [self.events[position] for position in candidates
+                if _matches(self.events[position], event_type, user, since, until)]
+
+    def read_range(self, start, stop):
+        return self.events[start:stop]
+
+    def close(self):
+        pass
+
+    def __len__(self):
+        return len(self.events)
+
+
+class CompactEventStore:
+    """
+    Columnar in-memory audit event store.
+
+    Events are kept in parallel typed arrays instead of one dict per event.
+    Timestamps are 64-bit nanoseconds since the epoch. Event types and users
+    are 32-bit codes into interned lookup tables. Details stay in a plain
+    list. Dicts are only built for the events a query returns. When NumPy is
+    installed, filters run as vectorized comparisons over zero-copy views of
+    the columns.
+    """
+
+    def __init__(self):
+        self._timestamps = array("q")
+        self._event_type_codes = array("I")
+        self._user_codes = array("I")
+        self._details = []
+        self._event_types = []
+        self._users = []
+        self._event_type_lookup = {}
+        self._user_lookup = {}
+        self._chronological = True
+
+    @staticmethod
+    def _intern(value, table, lookup):
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(table)
+            table.append(value)
+        return code
+
+    @staticmethod
+    def _to_nanoseconds(timestamp):
+        return (timestamp - _EPOCH) // _MICROSECOND * 1000
+
+    def append(self, event):
+        timestamp = self._to_nanoseconds(event["timestamp"])
+        if self._timestamps and timestamp < self._timestamps[-1]:
+            self._chronological = False
+        self._timestamps.append(timestamp)
+        self._event_type_codes.append(self._intern(event["event_type"], self._event_types, self._event_type_lookup))
+        self._user_codes.append(self._intern(event["user"], self._users, self._user_lookup))
+        self._details.append(event["details"])
+
+    def append_many(self, events):
+        for event in events:
+            self.append(event)
+
+    def _event(self, position):
+        return {
+            "timestamp": _EPOCH + datetime.timedelta(microseconds=self._timestamps[position] // 1000),
+            "event_type": self._event_types[self._event_type_codes[position]],
+            "user": self._users[self._user_codes[position]],
+            "details": self._details[position]
+        }
+
+    def __getitem__(self, position):
+        return self._event(position)
+
+    def _positions(self, event_type, user, since, until):
+        event_type_code = None if event_type is None else self._event_type_lookup.get(event_type)
+        user_code = None if user is None else self._user_lookup.get(user)
+        if (event_type is not None and event_type_code is None) or (user is not None and user_code is None):
+            return []
+        since_ns = None if since is None else self._to_nanoseconds(since)
+        until_ns = None if until is None else self._to_nanoseconds(until)
+
+        if np is not None:
+            mask = np.ones(len(self._timestamps), dtype=bool)
+            if since_ns is not None or until_ns is not None:
+                timestamps = np.frombuffer(self._timestamps, dtype=np.int64)
+                if since_ns is not None:
+                    mask &= timestamps >= since_ns
+                if until_ns is not None:
+                    mask &= timestamps < until_ns
+            if event_type_code is not None:
+                mask &= np.frombuffer(self._event_type_codes, dtype=np.uint32) == event_type_code
+            if user_code is not None:
+                mask &= np.frombuffer(self._user_codes, dtype=np.uint32) == user_code
+            return np.flatnonzero(mask).tolist()
+
+        if self._chronological:
+            low = 0 if since_ns is None else bisect_left(self._timestamps, since_ns)
+            high = len(self._timestamps) if until_ns is None else bisect_left(self._timestamps, until_ns)
+            since_ns = until_ns = None
+        else:
+            low, high = 0, len(self._timestamps)
+        return [
+            position for position in range(low, high)
+            if (event_type_code is None or self._event_type_codes[position] == event_type_code)
+            and (user_code is None or self._user_codes[position] == user_code)
+            and (since_ns is None or self._timestamps[position] >= since_ns)
+            and (until_ns is None or self._timestamps[position] < until_ns)
+        ]
+
+    def count(self, event_type=None, user=None, since=None, until=None):
+        """Count matching events without building their dicts."""
+        return len(self._positions(event_type, user, since, until))
+
+    def query(self, event_type=None, user=None, since=None, until=None):
+        if event_type is None and user is None and since is None and until is None:
+            positions = range(len(self._timestamps))
+        else:
+            positions = self._positions(event_type, user, since, until)
+        return [self._event(position) for position in positions]
+
+    def read_range(self, start, stop):
+        return [self._event(position) for position in range(start, min(stop, len(self._timestamps)))]
+
+    def close(self):
+        pass
+
+    def __len__(self):
+        return len(self._timestamps)
+
+
+class SegmentedAuditLog:
+    """
+    Append-only on-disk audit log split into time-bucketed, rotating segment files.
+
+    Events are written as JSON lines to ``audit-<bucket>-<seq>.jsonl``. A new
+    segment starts whenever an event falls into a different time bucket or
+    the active segment reaches ``max_segment_events``. Sealed segments get a
+    sidecar ``.idx`` file summarising their time span, event types and users.
+    On open only the sidecars and the active segment are read. The resulting
+    in-memory indexes let a query open just the segments that can hold
+    matching events.
+
+    Parameters:
+    - directory (str): Directory holding the segment files.
+    - bucket_seconds (int): Width of a segment's time bucket in seconds.
+    - max_segment_events (int): Maximum number of events per segment.
+    """
+
+    def __init__(self, directory, bucket_seconds=3600, max_segment_events=100000):
+        self.directory = directory
+        self.bucket_seconds = bucket_seconds
+        self.max_segment_events = max_segment_events
+        # Segment metadata by file name (bucket start, then sequence number)
+        self._segments = {}
+        self._by_event_type = {}
+        self._by_user = {}
+        self._active = None
+        self._active_file = None
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    # Segment metadata
+
+    @staticmethod
+    def _new_info(name, bucket, offset):
+        # offset is the log-wide position of the segment's first event
+        return {"name": name, "bucket": bucket, "offset": offset, "count": 0, "first": None, "last": None,
+                "event_types": set(), "users": set()}
+
+    def _index_event(self, info, event):
+        timestamp = event["timestamp"]
+        if info["first"] is None or timestamp < info["first"]:
+            info["first"] = timestamp
+        if info["last"] is None or timestamp > info["last"]:
+            info["last"] = timestamp
+        info["count"] += 1
+        self._total += 1
+        if event["event_type"] not in info["event_types"]:
+            info["event_types"].add(event["event_type"])
+            self._by_event_type.setdefault(event["event_type"], set()).add(info["name"])
+        if event["user"] not in info["users"]:
+            info["users"].add(event["user"])
+            self._by_user.setdefault(event["user"], set()).add(info["name"])
+
+    def _register(self, info):
+        self._segments[info["name"]] = info
+        self._total += info["count"]
+        for event_type in info["event_types"]:
+            self._by_event_type.setdefault(event_type, set()).add(info["name"])
+        for user in info["users"]:
+            self._by_user.setdefault(user, set()).add(info["name"])
+
+    def _load(self):
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith("audit-") and name.endswith(".jsonl"))
+        unsealed = []
+        for name in names:
+            sidecar = os.path.join(self.directory, f"{name}.idx")
+            if not os.path.exists(sidecar):
+                unsealed.append(name)
+                continue
+            with open(sidecar) as index_file:
+                info = json.load(index_file)
+            info["first"] = datetime.datetime.fromisoformat(info["first"])
+            info["last"] = datetime.datetime.fromisoformat(info["last"])
+            info["event_types"] = set(info["event_types"])
+            info["users"] = set(info["users"])
+            self._register(info)
+        for name in unsealed:
+            # Unsealed segments come after every sealed one; only the newest stays active
+            info = self._new_info(name, int(name.split("-")[1]), self._total)
+            self._segments[name] = info
+            for event in self._read_segment(name):
+                self._index_event(info, event)
+            if self._active is not None:
+                self._write_sidecar(self._active)
+            self._active = info
+        if self._active is not None:
+            self._active_file = open(os.path.join(self.directory, self._active["name"]), "a+")
+            self._active_file.seek(0, os.SEEK_END)
+            if self._active_file.tell() > 0:
+                self._active_file.seek(self._active_file.tell() - 1)
+                if self._active_file.read(1) != "\n":
+                    # Terminate a torn final line so new events start on a fresh one
+                    self._active_file.write("\n")
+
+    def _seal(self):
+        if self._active is None:
+            return
+        self._active_file.close()
+        self._active_file = None
+        self._write_sidecar(self._active)
+        self._active = None
+
+    def _write_sidecar(self, info):
+        if info["count"] == 0:
+            return
+        sidecar = dict(info, first=info["first"].isoformat(), last=info["last"].isoformat(),
+                       event_types=sorted(info["event_types"]), users=sorted(info["users"]))
+        path = os.path.join(self.directory, f"{info['name']}.idx")
+        with open(f"{path}.tmp", "w") as index_file:
+            json.dump(sidecar, index_file)
+        os.replace(f"{path}.tmp", path)
+
+    def _rotate(self, bucket):
+        self._seal()
+        sequence = sum(1 for info in self._segments.values() if info["bucket"] == bucket)
+        name = f"audit-{bucket:012d}-{sequence:04d}.jsonl"
+        self._active = self._new_info(name, bucket, self._total)
+        self._segments[name] = self._active
+        self._active_file = open(os.path.join(self.directory, name), "a")
+
+    # Reading and writing
+
+    def _bucket_of(self, timestamp):
+        return int(timestamp.timestamp()) // self.bucket_seconds * self.bucket_seconds
+
+    def append(self, event):
+        self.append_many((event,))
+
+    def append_many(self, events):
+        """Append a batch of events, writing and flushing each segment once."""
+        lines = []
+        for event in events:
+            bucket = self._bucket_of(event["timestamp"])
+            if (self._active is None or self._active["bucket"] != bucket
+                    or self._active["count"] >= self.max_segment_events):
+                if lines:
+                    self._active_file.write("".join(lines))
+                    lines = []
+                self._rotate(bucket)
+            record = dict(event, timestamp=event["timestamp"].isoformat())
+            lines.append(json.dumps(record, default=str) + "\n")
+            self._index_event(self._active, event)
+        if lines:
+            self._active_file.write("".join(lines))
+        if self._active_file is not None:
+            self._active_file.flush()
+
+    def _read_segment(self, name):
+        with open(os.path.join(self.directory, name)) as segment_file:
+            for line in segment_file:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn line from an interrupted write
+                    continue
+                event["timestamp"] = datetime.datetime.fromisoformat(event["timestamp"])
+                yield event
+
+    def _candidate_segments(self, event_type, user, since, until):
+        names = None
+        for index, value in ((self._by_event_type, event_type), (self._by_user, user)):
+            if value is not None:
+                matching = index.get(value, set())
+                names = matching if names is None else names & matching
+        infos = self._segments.values() if names is None else (self._segments[name] for name in names)
+        selected = []
+        for info in infos:
+            if info["count"] == 0:
+                continue
+            if since is not None and info["last"] < since:
+                continue
+            if until is not None and info["first"] >= until:
+                continue
+            selected.append(info["name"])
+        return sorted(selected)
+
+    def query(self, event_type=None, user=None, since=None, until=None):
+        if self._active_file is not None:
+            self._active_file.flush()
+        events = []
+        for name in self._candidate_segments(event_type, user, since, until):
+            events.extend(event for event in self._read_segment(name)
+                          if _matches(event, event_type, user, since, until))
+        return events
+
+    def read_range(self, start, stop):
+        """Return the events at log positions ``start`` to ``stop`` in append order."""
+        if self._active_file is not None:
+            self._active_file.flush()
+        events = []
+        for info in sorted(self._segments.values(), key=lambda info: info["offset"]):
+            offset = info["offset"]
+            if offset + info["count"] <= start or offset >= stop:
+                continue
+            segment_events = list(self._read_segment(info["name"]))
+            events.extend(segment_events[max(start - offset, 0):stop - offset])
+        return events
+
+    def segment_names(self):
+        """Return the names of all segments in order."""
+        return sorted(self._segments)
+
+    def close(self):
+        """Seal the active segment so the next open only reads sidecar indexes."""
+        self._seal()
+
+    def __len__(self):
+        return self._total
+
+
+def _event_leaf_hash(event):
+    # Canonical JSON encoding as in BlockchainSpaceData.hash_block, domain-separated per RFC 6962
+    record = dict(event, timestamp=event["timestamp"].isoformat())
+    return hashlib.sha256(b"\x00" + json.dumps(record, sort_keys=True, default=str).encode()).digest()
+
+
+def _node_hash(left, right):
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _split_point(size):
+    # Largest power of two strictly smaller than size
+    return 1 << ((size - 1).bit_length() - 1)
+
+
+class MerkleAuditLog:
+    """
+    Merkle tree over audit event hashes with hash-chained checkpoints.
+
+    Leaves are appended in log order and the tree follows the RFC 6962
+    (Certificate Transparency) layout. The roots of all complete subtrees
+    are cached, so the root for any tree size costs O(log n) hashes. Every
+    ``checkpoint_interval`` events a checkpoint records the tree size and
+    root. Each checkpoint is chained to the previous one by hash, so the
+    batches of events between checkpoints form a hash chain.
+
+    A range of events is verified against a checkpoint by hashing just
+    those events and combining them with O(log n) cached subtree roots from
+    outside the range. Any altered, removed or reordered event changes the
+    recomputed root.
+
+    Parameters:
+    - checkpoint_interval (int): Number of events between automatic checkpoints.
+    - directory (str, optional): Directory where leaf hashes and checkpoints are persisted.
+    """
+
+    def __init__(self, checkpoint_interval=1024, directory=None):
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoints = []
+        # _levels[h][i] is the root of the complete subtree over leaves [i * 2**h, (i + 1) * 2**h)
+        self._levels = [[]]
+        self._leaf_file = None
+        self._checkpoint_file = None
+        if directory is not None:
+            self._load(directory)
+
+    def _load(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        leaf_path = os.path.join(directory, "merkle.leaves")
+        checkpoint_path = os.path.join(directory, "merkle.checkpoints")
+        if os.path.exists(leaf_path):
+            with open(leaf_path, "rb") as leaf_file:
+                leaves = leaf_file.read()
+            complete = len(leaves) - len(leaves) % 32
+            if complete < len(leaves):
+                # Drop a leaf torn by a crash so new leaves stay 32-byte aligned
+                os.truncate(leaf_path, complete)
+            for offset in range(0, complete, 32):
+                self._add_leaf(leaves[offset:offset + 32])
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, "rb") as checkpoint_file:
+                lines = checkpoint_file.read()
+            complete = lines.rfind(b"\n") + 1
+            if complete < len(lines):
+                os.truncate(checkpoint_path, complete)
+            self.checkpoints = [json.loads(line) for line in lines[:complete].splitlines()]
+        self._leaf_file = open(leaf_path, "ab")
+        self._checkpoint_file = open(checkpoint_path, "a")
+
+    @property
+    def size(self):
+        return len(self._levels[0])
+
+    def _add_leaf(self, leaf):
+        self._levels[0].append(leaf)
+        height = 0
+        while len(self._levels[height]) % 2 == 0:
+            parent = _node_hash(self._levels[height][-2], self._levels[height][-1])
+            if height + 1 == len(self._levels):
+                self._levels.append([])
+            self._levels[height + 1].append(parent)
+            height += 1
+
+    def append_many(self, events):
+        """Add the hashes of ``events`` and emit any checkpoints that fall due."""
+        leaves = []
+        for event in events:
+            leaf = _event_leaf_hash(event)
+            leaves.append(leaf)
+            self._add_leaf(leaf)
+            if self.size % self.checkpoint_interval == 0:
+                self.checkpoint()
+        if self._leaf_file is not None:
+            self._leaf_file.write(b"".join(leaves))
+            self._leaf_file.flush()
+
+    def _subtree_root(self, start, end):
+        size = end - start
+        if size & (size - 1) == 0:
+            height = size.bit_length() - 1
+            return self._levels[height][start >> height]
+        split = _split_point(size)
+        return _node_hash(self._subtree_root(start, start + split), self._subtree_root(start + split, end))
+
+    def root(self, tree_size=None):
+        """Return the Merkle root over the first ``tree_size`` events (all by default)."""
+        tree_size = self.size if tree_size is None else tree_size
+        if tree_size == 0:
+            return hashlib.sha256(b"").digest()
+        return self._subtree_root(0, tree_size)
+
+    def checkpoint(self):
+        """
+        Record a checkpoint of the current tree.
+
+        Returns:
+        - dict: Tree size, hex root, previous checkpoint digest and this checkpoint's digest.
+        """
+        previous = self.checkpoints[-1]["digest"] if self.checkpoints else "0" * 64
+        root = self.root().hex()
+        digest = hashlib.sha256(f"{previous}{self.size}{root}".encode()).hexdigest()
+        checkpoint = {
+            "tree_size": self.size,
+            "root": root,
+            "previous": previous,
+            "digest": digest,
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+        self.checkpoints.append(checkpoint)
+        if self._checkpoint_file is not None:
+            self._checkpoint_file.write(json.dumps(checkpoint) + "\n")
+            self._checkpoint_file.flush()
+        return checkpoint
+
+    def verify_checkpoint_chain(self):
+        """Return True when every checkpoint links to its predecessor by hash."""
+        previous = "0" * 64
+        for checkpoint in self.checkpoints:
+            digest = hashlib.sha256(f"{previous}{checkpoint['tree_size']}{checkpoint['root']}".encode()).hexdigest()
+            if checkpoint["previous"] != previous or checkpoint["digest"] != digest:
+                return False
+            previous = digest
+        return True
+
+    def verify_range(self, start, events, checkpoint):
+        """
+        Check that ``events`` are exactly the events logged at positions ``start`` onwards.
+
+        Parameters:
+        - start (int): Log position of the first event.
+        - events (list): The events as read back from the store.
+        - checkpoint (dict): Checkpoint whose tree covers the whole range.
+
+        Returns:
+        - bool: True when the recomputed root matches the checkpoint root.
+        """
+        stop = start + len(events)
+        tree_size = checkpoint["tree_size"]
+        if stop > tree_size or tree_size > self.size:
+            raise ValueError("The checkpoint does not cover the requested range.")
+        fresh = [_event_leaf_hash(event) for event in events]
+
+        def fresh_root(low, high):
+            if high - low == 1:
+                return fresh[low - start]
+            split = _split_point(high - low)
+            return _node_hash(fresh_root(low, low + split), fresh_root(low + split, high))
+
+        def combined_root(low, high):
+            if high <= start or low >= stop:
+                return self._subtree_root(low, high)
+            if start <= low and high <= stop:
+                return fresh_root(low, high)
+            split = _split_point(high - low)
+            return _node_hash(combined_root(low, low + split), combined_root(low + split, high))
+
+        if not fresh:
+            return True
+        return combined_root(0, tree_size).hex() == checkpoint["root"]
+
+    def close(self):
+        if self._leaf_file is not None:
+            self._leaf_file.close()
+            self._checkpoint_file.close()
+            self._leaf_file = self._checkpoint_file = None
+
+
+class AsyncAuditWriter:
+    """
+    Background writer that batches audit events for an event sink.
+
+    Callers only put a tuple on a bounded queue. A single consumer thread
+    drains it, turns raw epoch timestamps into event dicts and hands them to
+    the sink in batches of up to ``batch_size``. A batch is written early
+    once ``flush_interval`` seconds pass after its first event. When the
+    queue is full, producers block until the consumer catches up.
+
+    A sink failure does not stop the consumer. The failed batch is dropped
+    and reported as an ``audit_write_failed`` event, and the error is
+    re-raised by the next ``flush``. Events are numbered as they are
+    submitted, and ``flush`` waits only for the events submitted before it
+    was called, so it returns even under a steady stream of new events.
+
+    Parameters:
+    - sink (callable): Called with each batch as a list of event dicts.
+    - batch_size (int): Maximum number of events written per batch.
+    - flush_interval (float): Maximum seconds an event waits before being written.
+    - max_queue (int): Queue capacity before producers block.
+    """
+
+    _STOP = object()
+
+    def __init__(self, sink, batch_size=512, flush_interval=0.5, max_queue=65536):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        # Submission numbering and queue order must agree, so both happen under one lock
+        self._submit_lock = threading.Lock()
+        self._submitted = 0
+        self._written = 0
+        self._error = None
+        self._progress = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, timestamp, event_type, user, details):
+        with self._submit_lock:
+            self._submitted += 1
+            self._queue.put((timestamp, event_type, user, details))
+
+    def _write(self, batch):
+        try:
+            events = [
+                {
+                    "timestamp": datetime.datetime.fromtimestamp(timestamp),
+                    "event_type": event_type,
+                    "user": user,
+                    "details": details
+                }
+                for timestamp, event_type, user, details in batch
+            ]
+            self.sink(events)
+        except Exception as error:
+            _events.error("audit_write_failed", "Error: Failed to write %(count)d audit events: %(error)s",
+                          count=len(batch), error=error)
+            with self._progress:
+                self._error = error
+        finally:
+            with self._progress:
+                self._written += len(batch)
+                self._progress.notify_all()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stopping:
+                return
+
+    def flush(self):
+        """
+        Block until every event submitted before this call has been handed to the sink.
+
+        Raises the most recent sink error since the previous ``flush``, if any.
+        """
+        with self._submit_lock:
+            target = self._submitted
+        with self._progress:
+            self._progress.wait_for(lambda: self._written >= target or not self._thread.is_alive())
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Write the remaining events and stop the consumer thread."""
+        with self._submit_lock:
+            self._queue.put(self._STOP)
+        self._thread.join()
+
+
+class AuditTrail:
+    def __init__(self, directory=None, bucket_seconds=3600, max_segment_events=100000,
+                 async_writes=False, batch_size=512, flush_interval=0.5, max_queue=65536, compact=False,
+                 tamper_evident=False, checkpoint_interval=1024):
+        """
+        Initialize the audit trail.
+
+        Parameters:
+        - directory (str, optional): Directory for a persistent, segmented on-disk log.
+          When omitted the audit log is kept in memory.
+        - bucket_seconds (int): Time span covered by each on-disk segment.
+        - max_segment_events (int): Number of events after which a segment is rotated.
+        - async_writes (bool): Write events from a background thread in batches, so
+          ``log_event`` only enqueues. Reads wait for queued events to be written.
+        - batch_size (int): Maximum events per background batch.
+        - flush_interval (float): Maximum seconds an event is held before it is written.
+        - max_queue (int): Queued events allowed before ``log_event`` blocks.
+        - compact (bool): Keep the in-memory log in a columnar CompactEventStore instead
+          of one dict per event. Entries are returned as dicts on demand.
+        - tamper_evident (bool): Hash every event into a Merkle tree with periodic,
+          hash-chained checkpoints so ranges of the log can be verified.
+        - checkpoint_interval (int): Number of events between Merkle checkpoints.
+        """
+        if directory is None:
+            self._store = CompactEventStore() if compact else MemoryEventLog()
+        else:
+            self._store = SegmentedAuditLog(directory, bucket_seconds, max_segment_events)
+        self._merkle = None
+        if tamper_evident:
+            self._merkle = MerkleAuditLog(checkpoint_interval, directory)
+            if self._merkle.size > len(self._store):
+                raise ValueError("The Merkle leaf file does not match the audit log; the log may have been altered.")
+            if self._merkle.size < len(self._store):
+                # Events reach the store before their leaves, so a crash can leave the last leaves unwritten
+                missing = len(self._store) - self._merkle.size
+                self._merkle.append_many(self._store.read_range(self._merkle.size, len(self._store)))
+                _events.warning("merkle_rebuilt", "Rebuilt %(count)d missing Merkle leaves from the audit log.",
+                                count=missing)
+        self._lock = threading.Lock()
+        self._writer = None
+        if async_writes:
+            self._writer = AsyncAuditWriter(self._append_events, batch_size, flush_interval, max_queue)
+
+    def _append_events(self, events):
+        with self._lock:
+            self._store.append_many(events)
+            if self._merkle is not None:
+                self._merkle.append_many(events)
+
+    @property
+    def audit_log(self):
+        return self.get_audit_log()
 
     def log_event(self, event_type, user, details):
         """
@@ -15,6 +788,9 @@ class AuditTrail:
         - user (str): The user or system responsible for the event.
         - details (str): Additional details or description of the event.
         """
+        if self._writer is not None:
+            self._writer.submit(time.time(), event_type, user, details)
+            return
         timestamp = datetime.datetime.now()
         event = {
             "timestamp": timestamp,
@@ -22,16 +798,87 @@ class AuditTrail:
             "user": user,
             "details": details
         }
-        self.audit_log.append(event)
+        self._append_events([event])
 
-    def get_audit_log(self):
+    def get_audit_log(self, event_type=None, user=None, since=None, until=None):
         """
-        Retrieve the entire audit log.
+        Retrieve audit log entries, optionally filtered.
+
+        Parameters:
+        - event_type (str, optional): Only return events of this type.
+        - user (str, optional): Only return events caused by this user.
+        - since (datetime, optional): Only return events logged at or after this time.
+        - until (datetime, optional): Only return events logged before this time.
 
         Returns:
         - list: List of audit log entries, where each entry is a dictionary containing timestamp, event_type, user, and details.
         """
-        return self.audit_log
+        self.flush()
+        with self._lock:
+            return self._store.query(event_type, user, since, until)
+
+    def flush(self):
+        """Wait until every event logged so far has been written, re-raising any background write error."""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def checkpoint(self):
+        """
+        Record a Merkle checkpoint covering every event logged so far (tamper-evident mode).
+
+        Returns:
+        - dict: The checkpoint, including its tree size and hex Merkle root.
+        """
+        self._require_merkle()
+        self.flush()
+        with self._lock:
+            return self._merkle.checkpoint()
+
+    def verify_range(self, start, stop, checkpoint=None):
+        """
+        Verify that the events at positions ``start`` to ``stop`` have not been altered.
+
+        Only the events in the range are hashed, plus O(log n) subtree roots.
+
+        Parameters:
+        - start (int): Position of the first event to verify.
+        - stop (int): Position after the last event to verify.
+        - checkpoint (dict, optional): Checkpoint to verify against. Defaults to the latest one.
+
+        Returns:
+        - bool: True when the range matches the checkpointed Merkle root.
+        """
+        self._require_merkle()
+        self.flush()
+        with self._lock:
+            if checkpoint is None:
+                if not self._merkle.checkpoints or self._merkle.checkpoints[-1]["tree_size"] < stop:
+                    self._merkle.checkpoint()
+                checkpoint = self._merkle.checkpoints[-1]
+            events = self._store.read_range(start, stop)
+            if len(events) != stop - start:
+                return False
+            return self._merkle.verify_range(start, events, checkpoint)
+
+    def verify_checkpoints(self):
+        """Return True when the checkpoint hash chain is intact (tamper-evident mode)."""
+        self._require_merkle()
+        with self._lock:
+            return self._merkle.verify_checkpoint_chain()
+
+    def _require_merkle(self):
+        if self._merkle is None:
+            raise ValueError("The audit trail was not created with tamper_evident=True.")
+
+    def close(self):
+        """Write pending events, stop the background writer and seal the active on-disk segment."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        with self._lock:
+            self._store.close()
+            if self._merkle is not None:
+                self._merkle.close()
 
 # Example usage:
 if __name__ == "__main__":
@@ -46,3 +893,44 @@ if __name__ == "__main__":
     log_entries = audit.get_audit_log()
     for entry in log_entries:
         print(entry)
+
+    # Persistent, segmented audit log queried by user and time range
+    persistent_audit = AuditTrail(directory="talon_audit")
+    persistent_audit.log_event("Login", "user1", "User 'user1' logged in.")
+    persistent_audit.log_event("Data Access", "user1", "User 'user1' accessed telemetry.")
+    one_hour_ago = datetime.datetime.now() - datetime.timedelta(hours=1)
+    for entry in persistent_audit.get_audit_log(user="user1", since=one_hour_ago):
+        print(entry)
+    persistent_audit.close()
+
+    # Columnar in-memory log for multi-million-event workloads
+    compact_audit = AuditTrail(compact=True)
+    for sample in range(100000):
+        compact_audit.log_event("Telemetry Read", f"station{sample % 8}", "Read telemetry frame.")
+    print(f"Station 3 reads: {len(compact_audit.get_audit_log(user='station3'))}")
+
+    # Tamper-evident log: verify a range against a Merkle checkpoint
+    secure_audit = AuditTrail(tamper_evident=True, checkpoint_interval=256)
+    for sample in range(5000):
+        secure_audit.log_event("Command", "flight_ops", f"Uplinked command {sample}.")
+    print(f"Commands 1000-1100 intact: {secure_audit.verify_range(1000, 1100)}")
+    secure_audit.get_audit_log()[1050]["details"] = "Uplinked a forged command."
+    print(f"Commands 1000-1100 intact after tampering: {secure_audit.verify_range(1000, 1100)}")
+
+    # A crash can tear the last Merkle leaf; reopening truncates it and rebuilds leaves from the log
+    durable_audit = AuditTrail(directory="talon_secure_audit", tamper_evident=True, checkpoint_interval=64)
+    for sample in range(300):
+        durable_audit.log_event("Command", "flight_ops", f"Uplinked command {sample}.")
+    durable_audit.close()
+    leaf_path = os.path.join("talon_secure_audit", "merkle.leaves")
+    os.truncate(leaf_path, os.path.getsize(leaf_path) - 40)
+    recovered_audit = AuditTrail(directory="talon_secure_audit", tamper_evident=True, checkpoint_interval=64)
+    assert recovered_audit.verify_range(250, 300) and recovered_audit.verify_checkpoints()
+    recovered_audit.close()
+
+    # Background writer: log_event only enqueues, events are written in batches
+    async_audit = AuditTrail(directory="talon_audit", async_writes=True, batch_size=1024)
+    for request_number in range(10000):
+        async_audit.log_event("API Request", "service", f"Authenticated request {request_number}.")
+    print(f"Logged {len(async_audit.get_audit_log(event_type='API Request'))} API requests.")
+    async_audit.close()
@@ -1,44 +1,418 @@
 # auth.py - Authentication and Authorization Module
 
+import base64
 import hashlib
+import heapq
+import hmac
+import json
+import os
 import secrets
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from caching import CacheTier
+from instrumentation import get_event_logger, silenced
+
+_events = get_event_logger("auth")
+
+
+class SHA256Hasher:
+    """Legacy single-pass SHA-256 password hash, kept so existing records still verify."""
+
+    name = "sha256"
+
+    def params(self):
+        return {}
+
+    def hash(self, password, salt):
+        return hashlib.sha256(f"{password}{salt}".encode('utf-8')).hexdigest()
+
+
+class PBKDF2Hasher:
+    """
+    PBKDF2-HMAC password hash from hashlib.
+
+    Parameters:
+    - iterations (int): Number of HMAC iterations; the cost knob.
+    - hash_name (str): Underlying digest name.
+    """
+
+    name = "pbkdf2"
+
+    def __init__(self, iterations=600000, hash_name="sha256"):
+        self.iterations = iterations
+        self.hash_name = hash_name
+
+    def params(self):
+        return {"iterations": self.iterations, "hash_name": self.hash_name}
+
+    def hash(self, password, salt):
+        return hashlib.pbkdf2_hmac(self.hash_name, password.encode('utf-8'), bytes.fromhex(salt), self.iterations).hex()
+
+
+class ScryptHasher:
+    """
+    Memory-hard scrypt password hash from hashlib.
+
+    Parameters:
+    - n (int): CPU/memory cost, a power of two. Memory use is roughly 128 * n * r bytes.
+    - r (int): Block size.
+    - p (int): Parallelization factor.
+    """
+
+    name = "scrypt"
+
+    def __init__(self, n=2 ** 14, r=8, p=1):
+        self.n = n
+        self.r = r
+        self.p = p
+
+    def params(self):
+        return {"n": self.n, "r": self.r, "p": self.p}
+
+    def hash(self, password, salt):
+        maxmem = 256 * self.n * self.r * self.p + 1024 * 1024
+        return hashlib.scrypt(password.encode('utf-8'), salt=bytes.fromhex(salt),
+                              n=self.n, r=self.r, p=self.p, maxmem=maxmem).hex()
+
+
+PASSWORD_HASHERS = {hasher.name: hasher for hasher in (SHA256Hasher, PBKDF2Hasher, ScryptHasher)}
+
+
+class InMemoryUserStore(MutableMapping):
+    """User records kept in a process-local dict; lost on restart."""
 
-class Authentication:
     def __init__(self):
-        self.users = {}
+        self._users = {}
+
+    def __getitem__(self, username):
+        return self._users[username]
+
+    def __setitem__(self, username, record):
+        self._users[username] = record
+
+    def __delitem__(self, username):
+        del self._users[username]
+
+    def __iter__(self):
+        return iter(self._users)
+
+    def __len__(self):
+        return len(self._users)
+
+
+class ShardedFileUserStore(MutableMapping):
+    """
+    Persistent user records hash-sharded by username across JSON files.
+
+    A username always maps to the same shard file, chosen from a stable
+    SHA-256 hash rather than Python's per-process ``hash``. A shard is read
+    from disk the first time one of its users is accessed. Startup therefore
+    loads nothing, and a login touches a single small file. At most
+    ``max_loaded_shards`` shards are kept in memory, least recently used
+    first out. Each write rewrites only the affected shard: the new contents
+    go to a temporary file that is fsynced before ``os.replace`` swaps it in,
+    and the directory is fsynced afterwards, so a crash leaves either the old
+    or the new shard on disk. ``update`` stores many records with one rewrite
+    per affected shard. Iterating or counting users reads every shard.
+
+    Records are stored by value: assign an updated record back to the store
+    to persist it.
+
+    Parameters:
+    - directory (str): Directory holding the shard files.
+    - shards (int): Number of shard files. Must stay fixed for the lifetime of the directory.
+    - max_loaded_shards (int): Maximum number of shards kept in memory.
+    """
+
+    def __init__(self, directory, shards=1024, max_loaded_shards=64):
+        self.directory = directory
+        self.shards = shards
+        self.max_loaded_shards = max_loaded_shards
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _shard_for(self, username):
+        digest = hashlib.sha256(username.encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], "big") % self.shards
+
+    def _shard_path(self, shard):
+        return os.path.join(self.directory, f"users-{shard:04d}.json")
+
+    def _load(self, shard):
+        users = self._loaded.get(shard)
+        if users is None:
+            try:
+                with open(self._shard_path(shard)) as shard_file:
+                    users = json.load(shard_file)
+            except FileNotFoundError:
+                users = {}
+            self._loaded[shard] = users
+            # Every write is already on disk, so evicted shards are simply re-read when needed
+            while len(self._loaded) > self.max_loaded_shards:
+                self._loaded.popitem(last=False)
+        else:
+            self._loaded.move_to_end(shard)
+        return users
+
+    def _save(self, shard, users):
+        path = self._shard_path(shard)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as shard_file:
+            json.dump(users, shard_file)
+            shard_file.flush()
+            os.fsync(shard_file.fileno())
+        os.replace(temporary_path, path)
+        # The rename itself only survives a crash once the directory entry is on disk
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def __getitem__(self, username):
+        with self._lock:
+            return self._load(self._shard_for(username))[username]
+
+    def __contains__(self, username):
+        with self._lock:
+            return username in self._load(self._shard_for(username))
+
+    def __setitem__(self, username, record):
+        shard = self._shard_for(username)
+        with self._lock:
+            users = self._load(shard)
+            users[username] = record
+            self._save(shard, users)
+
+    def __delitem__(self, username):
+        shard = self._shard_for(username)
+        with self._lock:
+            users = self._load(shard)
+            del users[username]
+            self._save(shard, users)
+
+    def update(self, records):
+        """
+        Store many user records, rewriting each affected shard once.
+
+        Parameters:
+        - records (dict or iterable): Mapping or iterable of (username, record) pairs.
+        """
+        by_shard = {}
+        for username, record in dict(records).items():
+            by_shard.setdefault(self._shard_for(username), {})[username] = record
+        with self._lock:
+            for shard, shard_records in by_shard.items():
+                users = self._load(shard)
+                users.update(shard_records)
+                self._save(shard, users)
+
+    def __iter__(self):
+        for shard in range(self.shards):
+            with self._lock:
+                usernames = list(self._load(shard))
+            yield from usernames
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(self._load(shard)) for shard in range(self.shards))
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class Authentication:
+    """
+    User registration and password authentication.
+
+    Passwords are hashed with a pluggable KDF. The algorithm and its cost
+    parameters are stored with each user's salt. Records created with weaker
+    settings are rehashed transparently on the next successful login.
+    Successful verifications can be cached for a short time, keyed by an
+    HMAC of the credentials under a per-process secret. Repeated logins from
+    automated clients then skip the KDF, and the hasher's cost parameters
+    stay the one knob that governs login throughput.
+
+    Parameters:
+    - hasher (optional): Password hasher for new and rehashed records. Defaults to ``ScryptHasher()``.
+    - verification_cache (CacheTier, optional): Cache of successful verifications.
+      Defaults to a 10,000-entry cache with a 30 second time-to-live.
+      Pass False to disable caching.
+    - token_secret (bytes, optional): HMAC key for session tokens. Defaults to a random per-process key.
+    - token_ttl (float): Lifetime of issued session tokens in seconds.
+    - user_store (MutableMapping, optional): Where user records live. Defaults to an ``InMemoryUserStore``.
+    """
+
+    def __init__(self, hasher=None, verification_cache=None, token_secret=None, token_ttl=3600, user_store=None):
+        self.users = user_store if user_store is not None else InMemoryUserStore()
+        self.hasher = hasher if hasher is not None else ScryptHasher()
+        if verification_cache is None:
+            verification_cache = CacheTier(max_entries=10000, default_ttl=30)
+        self.verification_cache = verification_cache if verification_cache is not False else None
+        self._cache_key = secrets.token_bytes(32)
+        self.token_ttl = token_ttl
+        self._token_secret = token_secret if token_secret is not None else secrets.token_bytes(32)
+        # Revoked token ids -> expiry, with a heap so ids are forgotten once the token expires anyway
+        self._revoked = {}
+        self._revocation_heap = []
+        self._revocation_lock = threading.Lock()
 
     def register_user(self, username, password):
         # Placeholder for registering a new user
         if username in self.users:
-            print(f"Error: User '{username}' already exists.")
+            _events.warning("register_failed", "Error: User '%(username)s' already exists.", username=username)
         else:
-            salt = secrets.token_hex(16)
-            hashed_password = self._hash_password(password, salt)
-            self.users[username] = {"hashed_password": hashed_password, "salt": salt}
-            print(f"User '{username}' has been registered successfully.")
+            self.users[username] = self._new_record(password)
+            _events.info("registered", "User '%(username)s' has been registered successfully.", username=username)
+
+    def register_many(self, credentials):
+        """
+        Register many users in one batch without per-user console output.
+
+        Records are handed to the user store in a single ``update`` call, so a
+        ``ShardedFileUserStore`` rewrites each affected shard once.
+
+        Parameters:
+        - credentials (dict or iterable): Mapping or iterable of (username, password) pairs.
+          Usernames that already exist are skipped.
+
+        Returns:
+        - int: The number of users registered.
+        """
+        credentials = dict(credentials)
+        records = {username: self._new_record(password) for username, password in credentials.items()
+                   if username not in self.users}
+        self.users.update(records)
+        return len(records)
 
     def authenticate_user(self, username, password):
         # Placeholder for authenticating a user
         if username not in self.users:
-            print(f"Error: User '{username}' not found.")
+            _events.warning("unknown_user", "Error: User '%(username)s' not found.", username=username)
             return False
 
-        stored_hashed_password = self.users[username]["hashed_password"]
-        salt = self.users[username]["salt"]
-        hashed_password = self._hash_password(password, salt)
-
-        if stored_hashed_password == hashed_password:
-            print(f"User '{username}' has been authenticated successfully.")
+        if self._verify(username, password):
+            _events.info("authenticated", "User '%(username)s' has been authenticated successfully.", username=username)
             return True
         else:
-            print(f"Error: Authentication failed for user '{username}'.")
+            _events.warning("authentication_failed", "Error: Authentication failed for user '%(username)s'.", username=username)
             return False
 
-    def _hash_password(self, password, salt):
-        # Helper method for hashing the password using SHA-256
-        password_with_salt = f"{password}{salt}".encode('utf-8')
-        hashed_password = hashlib.sha256(password_with_salt).hexdigest()
-        return hashed_password
+    def issue_token(self, username, password, ttl=None):
+        """
+        Authenticate a user and issue a signed, expiring session token.
+
+        Parameters:
+        - username (str): The user to authenticate.
+        - password (str): The user's password.
+        - ttl (float, optional): Token lifetime in seconds, overriding ``token_ttl``.
+
+        Returns:
+        - str: The bearer token, or None when authentication fails.
+        """
+        if not self.authenticate_user(username, password):
+            return None
+        expires_at = int(time.time() + (self.token_ttl if ttl is None else ttl))
+        claims = {"sub": username, "exp": expires_at, "jti": secrets.token_hex(8)}
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode('utf-8'))
+        return f"{payload}.{_b64encode(self._sign(payload))}"
+
+    def validate_token(self, token):
+        """
+        Validate a session token without touching the user table.
+
+        Parameters:
+        - token (str): Bearer token issued by ``issue_token``.
+
+        Returns:
+        - str: The username the token was issued to, or None when it is invalid, expired or revoked.
+        """
+        claims = self._token_claims(token)
+        if claims is None or claims["exp"] <= time.time() or claims["jti"] in self._revoked:
+            return None
+        return claims["sub"]
+
+    def revoke_token(self, token):
+        """
+        Revoke a session token before it expires.
+
+        Parameters:
+        - token (str): Bearer token to revoke.
+
+        Returns:
+        - bool: True when the token was valid and is now revoked.
+        """
+        claims = self._token_claims(token)
+        now = time.time()
+        if claims is None or claims["exp"] <= now:
+            return False
+        with self._revocation_lock:
+            heap = self._revocation_heap
+            while heap and heap[0][0] <= now:
+                del self._revoked[heapq.heappop(heap)[1]]
+            if claims["jti"] not in self._revoked:
+                self._revoked[claims["jti"]] = claims["exp"]
+                heapq.heappush(heap, (claims["exp"], claims["jti"]))
+        _events.info("token_revoked", "Session token for user '%(username)s' has been revoked.", username=claims["sub"])
+        return True
+
+    def _sign(self, payload):
+        return hmac.new(self._token_secret, payload.encode('ascii'), hashlib.sha256).digest()
+
+    def _token_claims(self, token):
+        payload, _, signature = token.partition(".")
+        try:
+            if not hmac.compare_digest(_b64decode(signature), self._sign(payload)):
+                return None
+            return json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+
+    def _new_record(self, password):
+        salt = secrets.token_hex(16)
+        return {
+            "hashed_password": self.hasher.hash(password, salt),
+            "salt": salt,
+            "algorithm": self.hasher.name,
+            "params": self.hasher.params()
+        }
+
+    def _hash_password(self, password, record):
+        # Records without an algorithm predate pluggable hashers and use SHA-256
+        hasher = PASSWORD_HASHERS[record.get("algorithm", "sha256")](**record.get("params", {}))
+        return hasher.hash(password, record["salt"])
+
+    def _verify(self, username, password):
+        record = self.users[username]
+        token = None
+        if self.verification_cache is not None:
+            credentials = f"{username}\x00{password}".encode('utf-8')
+            token = hmac.new(self._cache_key, credentials, hashlib.sha256).digest()
+            # The cached hash must still be the stored one, so password changes invalidate it
+            cached = self.verification_cache.get(token)
+            if cached is not None and hmac.compare_digest(cached, record["hashed_password"]):
+                return True
+
+        if not hmac.compare_digest(self._hash_password(password, record), record["hashed_password"]):
+            return False
+
+        if record.get("algorithm") != self.hasher.name or record.get("params") != self.hasher.params():
+            record = self._new_record(password)
+            self.users[username] = record
+            _events.info("rehashed", "Password hash for user '%(username)s' was upgraded to %(algorithm)s.",
+                         username=username, algorithm=self.hasher.name)
+        if token is not None:
+            self.verification_cache.put(token, record["hashed_password"])
+        return True
 
 # Example usage:
 if __name__ == "__main__":
@@ -52,3 +426,35 @@ if __name__ == "__main__":
     # Authenticate users
     auth.authenticate_user("user1", "password123")
     auth.authenticate_user("user2", "invalid_password")
+
+    # Legacy SHA-256 records keep working and are upgraded on the next login
+    salt = secrets.token_hex(16)
+    auth.users["legacy"] = {"hashed_password": SHA256Hasher().hash("s3cret", salt), "salt": salt}
+    auth.authenticate_user("legacy", "s3cret")
+    print(f"Legacy user now hashed with: {auth.users['legacy']['algorithm']}")
+
+    # Burst of logins from an automated client: only the first one runs the KDF
+    with silenced():
+        for _ in range(100):
+            auth.authenticate_user("user1", "password123")
+    print(f"Verification cache: {auth.verification_cache.stats()}")
+
+    # Session tokens: authenticate once, then validate each request without hashing
+    token = auth.issue_token("user2", "qwerty456")
+    print(f"Token belongs to: {auth.validate_token(token)}")
+    auth.revoke_token(token)
+    print(f"Token after revocation: {auth.validate_token(token)}")
+
+    # Persistent, sharded user store: a restarted service only loads the shards it touches
+    persistent_auth = Authentication(user_store=ShardedFileUserStore("talon_users", shards=64))
+    persistent_auth.register_user("ground_station_7", "uplink!2024")
+    restarted_auth = Authentication(user_store=ShardedFileUserStore("talon_users", shards=64))
+    restarted_auth.authenticate_user("ground_station_7", "uplink!2024")
+
+    # Provision a fleet of stations in one batch, touching each shard file once
+    fleet = {f"ground_station_{i}": f"uplink!{i:04d}" for i in range(100, 132)}
+    fleet_auth = Authentication(hasher=PBKDF2Hasher(iterations=1000),
+                                user_store=ShardedFileUserStore("talon_users", shards=64, max_loaded_shards=8))
+    print(f"Provisioned {fleet_auth.register_many(fleet)} stations; "
+          f"{len(fleet_auth.users._loaded)} shards held in memory")
+    assert fleet_auth.authenticate_user("ground_station_117", "uplink!0117")
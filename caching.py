@@ -0,0 +1,239 @@
+# caching.py - Caching Module
+
+import heapq
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheTier:
+    """
+    Bounded in-memory cache tier placed in front of a slower backing store.
+
+    Entries are evicted by least-recently-used (``"lru"``) or
+    least-frequently-used (``"lfu"``, ties broken by recency) order once the
+    entry count or byte budget is exceeded. Entries may carry a time-to-live;
+    expired entries are dropped lazily on access and eagerly whenever the
+    cache needs room. Replacing an entry leaves its old expiry record behind,
+    so the expiry heap is rebuilt from the live entries whenever it grows past
+    twice their number. All operations are thread-safe.
+
+    The default ``sizeof`` is ``sys.getsizeof``, which is shallow: a dict or
+    list counts only its own header and slots, not the objects it holds.
+    Pass a ``sizeof`` that estimates the full footprint when ``max_bytes``
+    must bound containers.
+
+    Parameters:
+    - max_entries (int, optional): Maximum number of cached entries.
+    - max_bytes (int, optional): Maximum total size of cached values as measured by ``sizeof``.
+    - policy (str): Eviction policy, ``"lru"`` or ``"lfu"``.
+    - default_ttl (float, optional): Time-to-live in seconds applied when ``put`` gets none.
+    - sizeof (callable): Function returning the size in bytes of a cached value. Defaults to the shallow ``sys.getsizeof``.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, policy="lru", default_ttl=None, sizeof=sys.getsizeof):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown cache eviction policy '{policy}'.")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.default_ttl = default_ttl
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        # key -> [value, size, expires_at, frequency]
+        self._entries = {}
+        # LRU order, or one recency-ordered bucket per frequency for LFU
+        self._order = OrderedDict()
+        self._buckets = {}
+        self._min_frequency = 0
+        self._expiry_heap = []
+        self._bytes = 0
+
+    # Recency / frequency bookkeeping
+
+    def _touch(self, key, entry):
+        if self.policy == "lru":
+            self._order.move_to_end(key)
+            return
+        frequency = entry[3]
+        bucket = self._buckets[frequency]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[frequency]
+            if self._min_frequency == frequency:
+                self._min_frequency = frequency + 1
+        entry[3] = frequency + 1
+        self._buckets.setdefault(frequency + 1, OrderedDict())[key] = None
+
+    def _track(self, key):
+        if self.policy == "lru":
+            self._order[key] = None
+        else:
+            self._buckets.setdefault(1, OrderedDict())[key] = None
+            self._min_frequency = 1
+
+    def _untrack(self, key, entry):
+        if self.policy == "lru":
+            del self._order[key]
+            return
+        bucket = self._buckets[entry[3]]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[entry[3]]
+            if self._min_frequency == entry[3]:
+                self._min_frequency = min(self._buckets, default=0)
+
+    def _victim(self):
+        if self.policy == "lru":
+            return next(iter(self._order))
+        return next(iter(self._buckets[self._min_frequency]))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._untrack(key, entry)
+        self._bytes -= entry[1]
+        return entry
+
+    # Expiry
+
+    def _purge_expired(self, now):
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            # Heap items are left behind when an entry is replaced; skip stale ones
+            if entry is not None and entry[2] == expires_at:
+                self._remove(key)
+                self.expirations += 1
+
+    def _compact_expiry_heap(self):
+        # Drop the records of replaced and removed entries
+        self._expiry_heap = [(entry[2], key) for key, entry in self._entries.items() if entry[2] is not None]
+        heapq.heapify(self._expiry_heap)
+
+    def _needs_room(self, size):
+        if self.max_entries is not None and len(self._entries) >= self.max_entries:
+            return True
+        return self.max_bytes is not None and self._bytes + size > self.max_bytes
+
+    # Public API
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for ``key``, or ``default`` on a miss.
+
+        Parameters:
+        - key: The key to look up.
+        - default: Value returned when the key is absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._touch(key, entry)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, ttl=None):
+        """
+        Cache ``value`` under ``key``, evicting entries as needed to stay within budget.
+
+        Parameters:
+        - key: The key to cache.
+        - value: The value to cache.
+        - ttl (float, optional): Time-to-live in seconds, overriding ``default_ttl``.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Larger than the whole budget: never worth caching
+            self.invalidate(key)
+            return
+        with self._lock:
+            now = time.monotonic()
+            expires_at = None if ttl is None else now + ttl
+            if key in self._entries:
+                self._remove(key)
+            # Make room before inserting so a new LFU entry is never its own victim
+            if self._needs_room(size):
+                self._purge_expired(now)
+            while self._entries and self._needs_room(size):
+                self._remove(self._victim())
+                self.evictions += 1
+            self._entries[key] = [value, size, expires_at, 1]
+            self._track(key)
+            self._bytes += size
+            if expires_at is not None:
+                heapq.heappush(self._expiry_heap, (expires_at, key))
+                if len(self._expiry_heap) > 2 * len(self._entries) + 16:
+                    self._compact_expiry_heap()
+
+    def invalidate(self, key):
+        """Drop ``key`` from the cache if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Drop every cached entry. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._order.clear()
+            self._buckets.clear()
+            self._expiry_heap.clear()
+            self._min_frequency = 0
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+        - dict: Hits, misses, evictions, expirations, current entry count and bytes in use.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and (entry[2] is None or entry[2] > time.monotonic())
+
+    def __len__(self):
+        return len(self._entries)
+
+# Example usage:
+if __name__ == "__main__":
+    cache = CacheTier(max_entries=2, policy="lfu", default_ttl=60)
+
+    cache.put("orbit", {"altitude_km": 408})
+    cache.put("attitude", {"roll": 0.1})
+    cache.get("orbit")
+    cache.put("thermal", {"panel_c": 21.5})  # Evicts "attitude", the least frequently used entry
+
+    print("Cached orbit:", cache.get("orbit"))
+    print("Cached attitude:", cache.get("attitude"))
+    print("Cache stats:", cache.stats())
+
+    # Re-putting hot keys keeps the expiry bookkeeping bounded by the live entries
+    for sample in range(10000):
+        cache.put("orbit", {"altitude_km": 408 + sample % 3})
+    assert len(cache._expiry_heap) <= 2 * len(cache) + 16
+    print("Expiry records after 10000 re-puts:", len(cache._expiry_heap))
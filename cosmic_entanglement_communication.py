@@ -1,8 +1,184 @@
 # cosmic_entanglement_communication.py - Cosmic Entanglement Communication Module
 
-from qiskit import Aer, execute, QuantumCircuit
-from qiskit.quantum_info import random_statevector
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+from qiskit.quantum_info import random_statevector, Statevector
 import cirq
+import numpy as np
+
+from quantum_execution import default_service
+
+BB84_REGISTERS = ("alice_bits", "alice_bases", "bob_bases", "bob_bits")
+
+
+class EntanglementRequired(Exception):
+    """Raised when a gate would entangle qubits of a product-state encoding."""
+
+
+class ProductStateEncoding:
+    """
+    Linear-size representation of a register of single-qubit BB84 states.
+
+    Qubit ``i`` is |bits[i]> when ``bases[i]`` is 0 (rectilinear) and
+    H|bits[i]>, i.e. |+> or |->, when ``bases[i]`` is 1 (diagonal). Gates that
+    keep the register a product state update the two arrays directly. A gate
+    that would entangle qubits raises EntanglementRequired instead of leaving
+    the product-state representation.
+
+    Parameters:
+    - bits (numpy.ndarray): Per-qubit bit values.
+    - bases (numpy.ndarray): Per-qubit bases.
+    """
+
+    def __init__(self, bits, bases):
+        self.bits = np.asarray(bits, dtype=np.uint8)
+        self.bases = np.asarray(bases, dtype=np.uint8)
+
+    @classmethod
+    def from_data(cls, data):
+        """Encode each byte of ``data`` as 8 diagonal-basis qubits, most significant bit first."""
+        bits = np.unpackbits(np.frombuffer(data.encode('utf-8'), dtype=np.uint8))
+        return cls(bits, np.ones(len(bits), dtype=np.uint8))
+
+    def h(self, qubit):
+        self.bases[qubit] ^= 1
+
+    def x(self, qubit):
+        # X|+> = |+> and X|-> = -|->: only a global phase in the diagonal basis
+        if self.bases[qubit] == 0:
+            self.bits[qubit] ^= 1
+
+    def cx(self, control, target):
+        if self.bases[control] == 0:
+            if self.bits[control]:
+                self.x(target)
+        elif self.bases[target] == 1:
+            # Phase kickback: in the diagonal basis CNOT XORs the target label into the control
+            self.bits[control] ^= self.bits[target]
+        else:
+            raise EntanglementRequired(f"CNOT({control}, {target}) entangles the qubits.")
+
+    def cx_chain(self):
+        """Apply CNOT(i, i + 1) for every neighbouring pair, in order."""
+        if np.all(self.bases == 1):
+            # Each step XORs in a label the chain has not modified yet
+            self.bits[:-1] ^= self.bits[1:]
+            return
+        for qubit in range(len(self.bits) - 1):
+            self.cx(qubit, qubit + 1)
+
+    def measure(self, bases=None, rng=None):
+        """
+        Measure every qubit, by default in its own basis.
+
+        Qubits measured in the other basis give uniformly random outcomes.
+
+        Returns:
+        - numpy.ndarray: The measurement outcomes.
+        """
+        if bases is None:
+            return self.bits.copy()
+        rng = rng if rng is not None else np.random.default_rng()
+        random_bits = rng.integers(0, 2, len(self.bits), dtype=np.uint8)
+        return np.where(np.asarray(bases, dtype=np.uint8) == self.bases, self.bits, random_bits)
+
+    def to_circuit(self):
+        """Return a circuit preparing this register from |0...0>."""
+        circuit = QuantumCircuit(len(self.bits))
+        for qubit in np.flatnonzero(self.bits):
+            circuit.x(int(qubit))
+        for qubit in np.flatnonzero(self.bases):
+            circuit.h(int(qubit))
+        return circuit
+
+    def __len__(self):
+        return len(self.bits)
+
+
+class BatchedBB84:
+    """
+    BB84 key generation with one simulator job per key block.
+
+    The block circuit has ``lanes`` qubits, and each shot of it runs one
+    independent BB84 round per lane. Alice's bit, Alice's basis and Bob's basis
+    are drawn inside the circuit by measuring |+> states. The qubit is then
+    prepared and measured under classical control of those coins. Running the
+    circuit once with many shots and ``memory=True`` therefore yields
+    ``shots * lanes`` rounds. The circuit uses only Clifford gates, resets and
+    classically controlled gates, so it runs on the stabilizer simulator.
+    Sifting is done with NumPy.
+
+    Parameters:
+    - backend: Qiskit backend used to run the block circuit.
+    - lanes (int): Qubits per circuit, i.e. rounds per shot.
+    """
+
+    def __init__(self, backend, lanes=16):
+        self.backend = backend
+        self.lanes = lanes
+        self._circuit = self._build_circuit(lanes)
+
+    @staticmethod
+    def _build_circuit(lanes):
+        qubits = QuantumRegister(lanes, "q")
+        alice_bits, alice_bases, bob_bases, bob_bits = (ClassicalRegister(lanes, name) for name in BB84_REGISTERS)
+        circuit = QuantumCircuit(qubits, alice_bits, alice_bases, bob_bases, bob_bits)
+        # Random coins: measure |+>, then reset the qubit for the next coin
+        for register in (alice_bits, alice_bases, bob_bases):
+            circuit.h(qubits)
+            circuit.measure(qubits, register)
+            circuit.reset(qubits)
+        for lane in range(lanes):
+            circuit.x(qubits[lane]).c_if(alice_bits[lane], 1)
+            circuit.h(qubits[lane]).c_if(alice_bases[lane], 1)
+            circuit.h(qubits[lane]).c_if(bob_bases[lane], 1)
+        circuit.measure(qubits, bob_bits)
+        return circuit
+
+    def run(self, rounds):
+        """
+        Run ``rounds`` BB84 rounds in a single job.
+
+        Returns:
+        - dict: ``alice_bits``, ``alice_bases``, ``bob_bases`` and ``bob_bits`` as uint8 arrays of length ``rounds``.
+        """
+        shots = -(-rounds // self.lanes)
+        job = default_service.run(self._circuit, self.backend, shots=shots, memory=True, method="stabilizer")
+        memory = job.result().get_memory(self._circuit)
+        # Each memory string holds the registers in reverse order, separated by spaces,
+        # with the first bit of each register rightmost
+        width = self.lanes + 1
+        raw = np.frombuffer("".join(memory).encode("ascii"), dtype=np.uint8).reshape(shots, len(memory[0]))
+        outcomes = {}
+        for position, name in enumerate(reversed(BB84_REGISTERS)):
+            columns = raw[:, position * width:position * width + self.lanes][:, ::-1]
+            outcomes[name] = (columns - ord("0")).reshape(-1)[:rounds]
+        return outcomes
+
+    @staticmethod
+    def sift(outcomes):
+        """Keep the rounds where Alice and Bob chose the same basis, returning (Alice's key, Bob's key)."""
+        matching = outcomes["alice_bases"] == outcomes["bob_bases"]
+        return outcomes["alice_bits"][matching], outcomes["bob_bits"][matching]
+
+    def generate_key(self, key_size, block_rounds=65536):
+        """
+        Generate sifted key material of ``key_size`` bits.
+
+        About half of the rounds survive sifting, so blocks of
+        ``block_rounds`` rounds are run until enough bits are collected.
+
+        Returns:
+        - tuple: (Alice's key, Bob's key) as uint8 arrays.
+        """
+        alice_keys, bob_keys, collected = [], [], 0
+        while collected < key_size:
+            rounds = min(block_rounds, 2 * (key_size - collected) + 64)
+            alice_key, bob_key = self.sift(self.run(rounds))
+            alice_keys.append(alice_key)
+            bob_keys.append(bob_key)
+            collected += len(alice_key)
+        return np.concatenate(alice_keys)[:key_size], np.concatenate(bob_keys)[:key_size]
+
 
 class CosmicEntanglementCommunication:
     def __init__(self, supported_destinations):
@@ -15,125 +191,74 @@ class CosmicEntanglementCommunication:
         self.use_qiskit = True
         self.is_initialized = False
         self.supported_destinations = supported_destinations
+        self.bb84_engine = None
 
     def initialize_quantum_backend(self):
         """Initialize quantum backends for actual quantum operations in Qiskit and Cirq."""
-        self.qiskit_backend = Aer.get_backend('qasm_simulator')
+        self.qiskit_backend = default_service.get_backend('qasm_simulator')
         self.cirq_simulator = cirq.Simulator()
 
     def quantum_generate_random_state(self, num_qubits):
         """Generate a random quantum state with 'num_qubits' qubits."""
         return random_statevector(num_qubits).data
 
-def _encode_data_to_quantum_state(self, data):
-        """Encode classical data into quantum states using BB84 encoding."""
-        num_qubits = len(data) * 8  # Each character is represented by 8 qubits
-
-        # Generate a random quantum state for encoding
-        random_state = self.quantum_generate_random_state(num_qubits)
-
-        # Create the quantum circuit for BB84 encoding
-        encoding_circuit = QuantumCircuit(num_qubits, num_qubits)
-
-        for i, char in enumerate(data):
-            # Encode each character into qubits using Hadamard and Pauli-X gates
-            byte = format(ord(char), '08b')
-            for j, bit in enumerate(byte):
-                if bit == '1':
-                    encoding_circuit.x(i * 8 + j)
-                encoding_circuit.h(i * 8 + j)
+    def _encode_data_to_quantum_state(self, data):
+        """
+        Encode classical data into quantum states using BB84 encoding.
 
-        # Apply a CNOT gate to entangle the qubits
-        for i in range(num_qubits - 1):
-            encoding_circuit.cx(i, i + 1)
-
-        # Measure the qubits to obtain the final quantum state
-        encoding_circuit.measure(range(num_qubits), range(num_qubits))
-
-        # Execute the circuit and get the results
-        job = execute(encoding_circuit, self.qiskit_backend, shots=1)
-        result = job.result()
-        counts = result.get_counts(encoding_circuit)
-
-        # Use the measurement results to create the final quantum state
-        state_vector = [0] * (2 ** num_qubits)
-        for outcome in counts:
-            state_vector[int(outcome[::-1], 2)] = 1
-
-        return state_vector
+        Each character byte becomes 8 qubits prepared with Pauli-X and
+        Hadamard gates, then chained with CNOT gates. These are product states
+        in the diagonal basis, and a CNOT between diagonal-basis qubits keeps
+        them product states, so the encoding is tracked per qubit in memory
+        linear in the message length.
+        """
+        encoding = ProductStateEncoding.from_data(data)
+        encoding.cx_chain()
+        return encoding
 
     def _decode_quantum_state_to_data(self, quantum_state):
         """Decode quantum data back into classical data using BB84 decoding."""
-        num_qubits = int(len(quantum_state).bit_length() / 2)
-        num_characters = num_qubits // 8
+        if not isinstance(quantum_state, ProductStateEncoding):
+            raise ValueError("Only product-state encodings can be decoded without disturbing the state.")
 
-        # Create the quantum circuit for BB84 decoding
-        decoding_circuit = QuantumCircuit(num_qubits, num_qubits)
-        decoding_circuit.initialize(quantum_state, range(num_qubits))
-
-        # Apply the Hadamard and Pauli-X gates to decode the qubits
-        for i in range(num_qubits):
-            decoding_circuit.h(i)
-            decoding_circuit.x(i)
-
-        # Measure the qubits to obtain the classical data
-        decoding_circuit.measure(range(num_qubits), range(num_qubits))
-
-        # Execute the circuit and get the results
-        job = execute(decoding_circuit, self.qiskit_backend, shots=1)
-        result = job.result()
-        counts = result.get_counts(decoding_circuit)
-
-        # Extract the classical data from the measurement outcomes
-        decoded_data = ""
-        for i in range(num_characters):
-            byte = ""
-            for j in range(8):
-                bit = str(int(counts[i * 8 + j]))
-                byte += bit
-            decoded_data += chr(int(byte, 2))
-
-        return decoded_data
+        # Measure each qubit in its own basis, then undo the CNOT chain on the diagonal-basis labels
+        labels = quantum_state.measure()
+        bits = np.bitwise_xor.accumulate(labels[::-1])[::-1]
+        return np.packbits(bits).tobytes().decode('utf-8')
 
     def _perform_quantum_communication_qiskit(self, destination, quantum_state):
         """Perform quantum communication through entangled connections using Qiskit."""
-        # Create the quantum circuit for communication using the entangled state
-        quantum_comm_circuit = QuantumCircuit(2, 2)
-        quantum_comm_circuit.initialize(quantum_state, [0, 1])
-
-        # Apply CNOT gate to the entangled qubits
-        quantum_comm_circuit.cx(0, 1)
-
-        # Measure the qubits to obtain the communicated quantum state
-        quantum_comm_circuit.measure([0, 1], [0, 1])
+        # Prepare the encoded register, then let the destination measure each qubit in its own basis.
+        # The circuit is Clifford, so it runs on the stabilizer fast path at any message length
+        quantum_comm_circuit = quantum_state.to_circuit()
+        for qubit in np.flatnonzero(quantum_state.bases):
+            quantum_comm_circuit.h(int(qubit))
+        quantum_comm_circuit.measure_all()
 
         # Execute the circuit and get the results
-        job = execute(quantum_comm_circuit, self.qiskit_backend, shots=1)
-        result = job.result()
-        counts = result.get_counts(quantum_comm_circuit)
+        job = default_service.run(quantum_comm_circuit, self.qiskit_backend, shots=1)
+        (outcome,) = job.result().get_counts(quantum_comm_circuit)
 
-        # Use the measurement results to obtain the transmitted quantum state
-        transmitted_state = [0, 0]
-        for outcome, count in counts.items():
-            transmitted_state[int(outcome, 2)] = count
+        # Qiskit prints qubit 0 rightmost; the outcomes are the labels in the agreed bases
+        labels = np.frombuffer(outcome[::-1].encode('ascii'), dtype=np.uint8) - ord('0')
+        return self._decode_quantum_state_to_data(ProductStateEncoding(labels, quantum_state.bases))
 
-        return transmitted_state
+    def _perform_quantum_communication(self, destination, quantum_state):
+        """Deliver an encoded state to the destination, which measures it in the agreed bases and decodes it."""
+        return self._decode_quantum_state_to_data(quantum_state)
 
-    def apply_quantum_key_distribution(self):
+    def apply_quantum_key_distribution(self, key_size=8):
         """Apply Quantum Key Distribution (QKD) for secure key establishment using BB84 protocol."""
         if not self.is_initialized:
             raise ValueError("Quantum communication system is not initialized.")
 
         print("Applying Quantum Key Distribution (QKD) for secure key establishment...")
-        # Implement BB84 protocol for quantum key distribution
-        key_size = 8  # Assuming an 8-bit key for demonstration purposes
-        alice_basis, alice_bits = self._generate_random_basis_and_bits(key_size)
-        bob_basis, bob_results = self._measure_qubits(key_size, alice_basis)
+        # Implement BB84 protocol for quantum key distribution, one simulator job per key block
+        if self.bb84_engine is None:
+            self.bb84_engine = BatchedBB84(self.qiskit_backend or default_service.get_backend('qasm_simulator'))
 
-        # Perform sifting to keep matching basis results
-        matching_indices = [i for i in range(key_size) if alice_basis[i] == bob_basis[i]]
-        sifted_key_alice = [alice_bits[i] for i in matching_indices]
-        sifted_key_bob = [bob_results[i] for i in matching_indices]
+        # Sifting keeps the results where Alice and Bob measured in matching bases
+        sifted_key_alice, sifted_key_bob = self.bb84_engine.generate_key(key_size)
 
         # Perform error correction (not implemented here, as it depends on the application)
         error_corrected_key_alice = sifted_key_alice
@@ -146,25 +271,7 @@ def _encode_data_to_quantum_state(self, data):
         print(f"Secure key generated by Alice: {final_key_alice}")
         print(f"Secure key generated by Bob: {final_key_bob}")
         print("Quantum Key Distribution is successfully applied for secure key establishment.")
-
-    def _generate_random_basis_and_bits(self, num_bits):
-        """Generate random basis and bits for the BB84 protocol."""
-        # For demonstration purposes, randomly choose basis and bits
-        alice_basis = [random_statevector(1).data[0] > 0 for _ in range(num_bits)]
-        alice_bits = [random_statevector(1).data[0] > 0 for _ in range(num_bits)]
-        return alice_basis, alice_bits
-
-    def _measure_qubits(self, num_bits, bases):
-        """Measure qubits in the specified bases."""
-        qubits = QuantumCircuit(num_bits, num_bits)
-        for i, basis in enumerate(bases):
-            if basis:
-                qubits.h(i)  # Hadamard gate for basis '0', X gate for basis '1'
-        qubits.measure(range(num_bits), range(num_bits))
-        job = execute(qubits, self.qiskit_backend)
-        result = job.result()
-        counts = result.get_counts(qubits)
-        return bases, [int(bit) for bit in list(counts.keys())[0]]
+        return final_key_alice, final_key_bob
 
     def _string_to_binary(self, data_string):
         """Convert a string to binary representation (ASCII encoding)."""
@@ -179,7 +286,7 @@ def _encode_data_to_quantum_state(self, data):
     def initialize_quantum_backend(self):
         """Initialize quantum backends for actual quantum operations."""
         # Choose specific quantum backends for Qiskit and Cirq
-        self.qiskit_backend = Aer.get_backend('qasm_simulator')
+        self.qiskit_backend = default_service.get_backend('qasm_simulator')
         self.cirq_simulator = cirq.Simulator()
 
     def transmit_quantum_data(self, data, destination):
@@ -266,29 +373,6 @@ def _encode_data_to_quantum_state(self, data):
 
         return qc
 
-    def _bb84_measure(self, state, measurement_basis):
-        """Measure the received quantum state using BB84 measurement."""
-        # Create a new quantum circuit with the same number of qubits as the state
-        qc = QuantumCircuit(len(measurement_basis), len(measurement_basis))
-
-        for i, basis in enumerate(measurement_basis):
-            if basis == "1":
-                qc.h(i)  # Apply Hadamard gate to measure in the X-basis
-
-            qc.measure(i, i)  # Measure qubits
-
-        # Simulate the quantum circuit using Qiskit
-        job = execute(qc, self.qiskit_backend)
-        result = job.result()
-        counts = result.get_counts(qc)
-
-        # Extract the measurement result
-        measurement_result = ""
-        for bit in measurement_basis:
-            measurement_result += list(counts.keys())[0]
-
-        return measurement_result
-
     def _generate_random_bit_string(self, length):
         """Generate a random bit string of the given length."""
         return ''.join(random.choice(["0", "1"]) for _ in range(length))
@@ -301,7 +385,7 @@ def _encode_data_to_quantum_state(self, data):
         if not self._is_supported_destination(destination):
             raise ValueError(f"The destination '{destination}' is not supported for quantum data transmission.")
 
-        if not self._is_already_entangled(self, destination):
+        if not self._is_already_entangled(self.sender, destination):
             raise ValueError(f"No entangled connection exists between the source and destination.")
 
         # Encode the data into quantum states using appropriate quantum encoding techniques
@@ -311,7 +395,73 @@ def _encode_data_to_quantum_state(self, data):
         transmitted_state = self._perform_quantum_communication(destination, quantum_state)
 
         return transmitted_state
-      
+
+    def apply_quantum_error_correction(self):
+        """Apply quantum error correction to ensure reliable data transmission."""
+        pass
+        # Implementation of quantum error correction techniques
+
+    def interstellar_entanglement_pair_distribution(self):
+        """Distribute entangled particle pairs to expand the entangled communication network."""
+        pass
+        # Implementation of the entangled particle pair distribution process
+
+    def cosmic_quantum_communication_monitoring(self):
+        """Monitor and diagnose the cosmic entanglement communication system."""
+        pass
+        # Implementation of real-time monitoring and diagnostics
+
+    def quantum_entanglement_resource_management(self):
+        """Manage entangled particle resources for efficient utilization."""
+        pass
+        # Implementation of resource management for entangled particles
+
+    def cosmic_key_exchange_and_authentication(self):
+        """Handle quantum key exchange and authentication for secure communication."""
+        pass
+        # Implementation of quantum key exchange and authentication
+
+    def quantum_entanglement_communication_security(self):
+        """Implement security measures to protect the entanglement communication system."""
+        pass
+        # Implementation of security protocols for the communication system
+
+    def cosmic_entanglement_communication_protocols_evolution(self):
+        """Evolve and improve communication protocols to adapt to advanced technologies."""
+        pass
+        # Implementation of the continuous evolution of communication protocols
+
+    def _apply_qkd_protocol(self):
+        """Implement Quantum Key Distribution (QKD) protocol for secure key exchange."""
+        # Advanced Quantum Key Distribution (QKD) protocols, such as BB84 or E91,
+        # are implemented to establish a secure key between communicating parties.
+        pass
+
+    def _is_supported_destination(self, destination):
+        """Check if the destination supports entangled connections."""
+        return destination in self.supported_destinations
+
+    def _is_already_entangled(self, source, destination):
+        """Check if there is already an entangled connection between source and destination."""
+        return (source, destination) in self.entangled_connections
+
+    def _calibrate_quantum_devices(self):
+        """Bring up the simulator backends used in place of physical quantum devices."""
+        if self.qiskit_backend is None:
+            self.initialize_quantum_backend()
+
+    def _create_entangled_pair(self):
+        """Create a Bell pair |Phi+> shared by the two ends of a connection."""
+        return Statevector.from_label('00').evolve(self._bell_circuit())
+
+    @staticmethod
+    def _bell_circuit():
+        bell = QuantumCircuit(2)
+        bell.h(0)
+        bell.cx(0, 1)
+        return bell
+
+
 def _is_supported_destination(self, destination):
     """Check if the destination supports entangled connections."""
     return destination in self.supported_destinations
@@ -440,51 +590,6 @@ def _is_already_entangled(self, source, destination):
     return True  # Placeholder check; actual implementation depends on system status
 
 
-    def apply_quantum_error_correction(self):
-        """Apply quantum error correction to ensure reliable data transmission."""
-        pass
-        # Implementation of quantum error correction techniques
-
-    def interstellar_entanglement_pair_distribution(self):
-        """Distribute entangled particle pairs to expand the entangled communication network."""
-        pass
-        # Implementation of the entangled particle pair distribution process
-
-    def cosmic_quantum_communication_monitoring(self):
-        """Monitor and diagnose the cosmic entanglement communication system."""
-        pass
-        # Implementation of real-time monitoring and diagnostics
-
-    def quantum_entanglement_resource_management(self):
-        """Manage entangled particle resources for efficient utilization."""
-        pass
-        # Implementation of resource management for entangled particles
-
-    def cosmic_key_exchange_and_authentication(self):
-        """Handle quantum key exchange and authentication for secure communication."""
-        pass
-        # Implementation of quantum key exchange and authentication
-
-    def quantum_entanglement_communication_security(self):
-        """Implement security measures to protect the entanglement communication system."""
-        pass
-        # Implementation of security protocols for the communication system
-
-    def cosmic_entanglement_communication_protocols_evolution(self):
-        """Evolve and improve communication protocols to adapt to advanced technologies."""
-        pass
-        # Implementation of the continuous evolution of communication protocols
-
-    def _apply_qkd_protocol(self):
-        """Implement Quantum Key Distribution (QKD) protocol for secure key exchange."""
-        # Advanced Quantum Key Distribution (QKD) protocols, such as BB84 or E91,
-        # are implemented to establish a secure key between communicating parties.
-        pass
-
-    def _is_supported_destination(self, destination):
-        """Check if the destination supports entangled connections."""
-        return destination in self.supported_destinations
-
 # Example usage:
 if __name__ == "__main__":
     supported_destinations = ["Earth", "Mars", "Alpha Centauri"]
@@ -501,7 +606,10 @@ if __name__ == "__main__":
     # Transmit quantum data securely
     data_to_transmit = "Hello, Alpha Centauri!"
     destination = "Alpha Centauri"
+    quantum_communication.establish_entangled_connection(quantum_communication.sender, destination)
     transmitted_state = quantum_communication.transmit_quantum_data(data_to_transmit, destination)
+    print(f"Received at {destination}: {transmitted_state}")
+    assert quantum_communication.transmit_quantum_data_qiskit(data_to_transmit, destination) == data_to_transmit
 
     # Apply quantum error correction
     quantum_communication.apply_quantum_error_correction()
@@ -1,30 +1,985 @@
 # database.py - Database Module
 
+import heapq
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import weakref
+import zlib
+from bisect import bisect_left
+from collections import deque, namedtuple
+from collections.abc import Mapping, MutableMapping
+from contextlib import ExitStack, contextmanager, nullcontext
+from itertools import filterfalse, groupby, repeat
+
+from caching import CacheTier
+from instrumentation import get_event_logger, silenced
+
+_events = get_event_logger("database")
+
+# Sentinel for cache misses, since None is a valid stored value
+_MISSING = object()
+
+# Shared stand-in for a key lock when the database is not in concurrent mode
+_NO_LOCK = nullcontext()
+
+# Record header: crc32, op, key length, value length
+_RECORD_HEADER = struct.Struct(">IBII")
+_OP_PUT = 1
+_OP_DELETE = 2
+
+
+def _write_all(fd, data):
+    # os.write may write only part of a large buffer
+    view = memoryview(data).cast("B")
+    written = 0
+    while written < view.nbytes:
+        written += os.write(fd, view[written:])
+
+
+class LogStructuredStore(MutableMapping):
+    """
+    Durable key/value store backed by an append-only write-ahead log.
+
+    Every insert or delete is appended to the log file and the in-memory
+    hash index maps each live key to the offset and length of its latest
+    value. When stale records make up more than ``compaction_ratio`` of the
+    log (and at least ``compaction_min_bytes``), the live records are
+    rewritten to a fresh log. A hint file holding the index is written on
+    compaction and on close, so reopening only loads the index and replays
+    the log tail written after the last hint instead of reading every value.
+
+    Parameters:
+    - path (str): Path of the log file. The hint file is stored next to it.
+    - sync (bool): Call fsync after every append for crash durability.
+    - compaction_ratio (float): Fraction of stale bytes that triggers compaction.
+    - compaction_min_bytes (int): Minimum stale bytes before compaction is considered.
+    """
+
+    def __init__(self, path, sync=False, compaction_ratio=0.5, compaction_min_bytes=4 * 1024 * 1024):
+        self.path = path
+        self.hint_path = f"{path}.hint"
+        self.sync = sync
+        self.compaction_ratio = compaction_ratio
+        self.compaction_min_bytes = compaction_min_bytes
+        self._index = {}
+        self._dead_bytes = 0
+        # Serializes appends and compaction; reads take it briefly so the fd never changes under them
+        self._lock = threading.RLock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._end = os.fstat(self._fd).st_size
+        self._load_index()
+
+    # Index recovery
+
+    def _load_index(self):
+        scan_from = 0
+        if os.path.exists(self.hint_path):
+            try:
+                with open(self.hint_path, "rb") as hint_file:
+                    hint = pickle.load(hint_file)
+                if hint["inode"] == os.fstat(self._fd).st_ino and hint["end"] <= self._end:
+                    self._index = hint["index"]
+                    self._dead_bytes = hint["dead_bytes"]
+                    scan_from = hint["end"]
+            except (OSError, EOFError, KeyError, pickle.UnpicklingError):
+                self._index = {}
+                self._dead_bytes = 0
+        self._replay(scan_from)
+
+    def _replay(self, offset):
+        # Records after the last hint are checksummed; the first bad one ends the log.
+        while offset < self._end:
+            header = os.pread(self._fd, _RECORD_HEADER.size, offset)
+            if len(header) < _RECORD_HEADER.size:
+                break
+            crc, op, key_len, value_len = _RECORD_HEADER.unpack(header)
+            record_len = _RECORD_HEADER.size + key_len + value_len
+            if offset + record_len > self._end:
+                break
+            body = os.pread(self._fd, key_len + value_len, offset + _RECORD_HEADER.size)
+            if zlib.crc32(body, op) != crc:
+                break
+            key = pickle.loads(body[:key_len])
+            previous = self._index.pop(key, None)
+            if previous is not None:
+                self._dead_bytes += previous[2]
+            if op == _OP_PUT:
+                self._index[key] = (offset + _RECORD_HEADER.size + key_len, value_len, record_len)
+            else:
+                self._dead_bytes += record_len
+            offset += record_len
+
+        if offset < self._end:
+            # Drop a torn record left behind by an interrupted write
+            os.ftruncate(self._fd, offset)
+            self._end = offset
+
+    # Log I/O
+
+    @staticmethod
+    def _encode_record(op, key_bytes, value_bytes):
+        crc = zlib.crc32(key_bytes + value_bytes, op)
+        header = _RECORD_HEADER.pack(crc, op, len(key_bytes), len(value_bytes))
+        return header + key_bytes + value_bytes
+
+    def _append(self, record):
+        offset = self._end
+        _write_all(self._fd, record)
+        if self.sync:
+            os.fsync(self._fd)
+        self._end += len(record)
+        return offset
+
+    def _read_value(self, entry):
+        value_offset, value_len, _ = entry
+        return pickle.loads(os.pread(self._fd, value_len, value_offset))
+
+    # Mapping interface
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._read_value(self._index[key])
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def __delitem__(self, key):
+        with self._lock:
+            if key not in self._index:
+                raise KeyError(key)
+            self.delete_many([key])
+
+    def update(self, items=(), **kwargs):
+        """Append a batch of values to the log with a single write."""
+        items = dict(items, **kwargs)
+        records = []
+        entries = []
+        # Offsets are relative to the start of the batch until it is appended
+        offset = 0
+        for key, value in items.items():
+            key_bytes = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+            value_bytes = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            record = self._encode_record(_OP_PUT, key_bytes, value_bytes)
+            records.append(record)
+            entries.append((key, (offset + _RECORD_HEADER.size + len(key_bytes), len(value_bytes), len(record))))
+            offset += len(record)
+        if not records:
+            return
+        with self._lock:
+            base = self._append(b"".join(records))
+            for key, (value_offset, value_len, record_len) in entries:
+                previous = self._index.get(key)
+                if previous is not None:
+                    self._dead_bytes += previous[2]
+                self._index[key] = (base + value_offset, value_len, record_len)
+            self._maybe_compact()
+
+    def delete_many(self, keys):
+        """Append tombstones for every live key in ``keys`` with a single write."""
+        with self._lock:
+            records = []
+            for key in keys:
+                previous = self._index.pop(key, None)
+                if previous is None:
+                    continue
+                key_bytes = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+                record = self._encode_record(_OP_DELETE, key_bytes, b"")
+                records.append(record)
+                self._dead_bytes += previous[2] + len(record)
+            if not records:
+                return
+            self._append(b"".join(records))
+            self._maybe_compact()
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(list(self._index))
+
+    def __len__(self):
+        return len(self._index)
+
+    # Maintenance
+
+    def _maybe_compact(self):
+        if self._dead_bytes >= self.compaction_min_bytes and self._dead_bytes >= self.compaction_ratio * self._end:
+            self._compact()
+
+    def compact(self):
+        """Rewrite the log so it only contains the latest value of each live key."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        tmp_path = f"{self.path}.compact"
+        new_index = {}
+        offset = 0
+        with open(tmp_path, "wb") as tmp_file:
+            for key, entry in self._index.items():
+                key_bytes = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+                value_bytes = os.pread(self._fd, entry[1], entry[0])
+                record = self._encode_record(_OP_PUT, key_bytes, value_bytes)
+                tmp_file.write(record)
+                new_index[key] = (offset + _RECORD_HEADER.size + len(key_bytes), len(value_bytes), len(record))
+                offset += len(record)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, self.path)
+        os.close(self._fd)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+        self._index = new_index
+        self._end = offset
+        self._dead_bytes = 0
+        self._write_hint()
+
+    def _write_hint(self):
+        tmp_path = f"{self.hint_path}.tmp"
+        with open(tmp_path, "wb") as hint_file:
+            hint = {
+                "inode": os.fstat(self._fd).st_ino,
+                "end": self._end,
+                "dead_bytes": self._dead_bytes,
+                "index": self._index,
+            }
+            pickle.dump(hint, hint_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.hint_path)
+
+    def flush(self):
+        """Force every record appended so far to disk, even when ``sync`` is off."""
+        with self._lock:
+            os.fsync(self._fd)
+
+    def close(self):
+        """Flush the log, persist the index hint and release the file handle."""
+        with self._lock:
+            if self._fd is None:
+                return
+            os.fsync(self._fd)
+            self._write_hint()
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class StripedStore(MutableMapping):
+    """
+    In-memory key/value store sharded across independently locked dicts.
+
+    Keys are routed to one of ``stripes`` shards by hash, and each shard is
+    guarded by its own reentrant lock, so writers touching different shards
+    never contend. Single-key reads are plain dict lookups. ``snapshot``
+    briefly takes every stripe lock in a fixed order and copies the shards,
+    giving a point-in-time view that later writes cannot affect.
+
+    Parameters:
+    - stripes (int): Number of shards and locks.
+    """
+
+    def __init__(self, stripes=16):
+        self.locks = tuple(threading.RLock() for _ in range(stripes))
+        self._shards = tuple({} for _ in range(stripes))
+
+    def lock_for(self, key):
+        """Return the stripe lock guarding ``key``."""
+        return self.locks[hash(key) % len(self.locks)]
+
+    def _group(self, keys):
+        groups = {}
+        stripes = len(self.locks)
+        for key in keys:
+            groups.setdefault(hash(key) % stripes, []).append(key)
+        return groups
+
+    def __getitem__(self, key):
+        return self._shards[hash(key) % len(self._shards)][key]
+
+    def __setitem__(self, key, value):
+        stripe = hash(key) % len(self._shards)
+        with self.locks[stripe]:
+            self._shards[stripe][key] = value
+
+    def __delitem__(self, key):
+        stripe = hash(key) % len(self._shards)
+        with self.locks[stripe]:
+            del self._shards[stripe][key]
+
+    def __contains__(self, key):
+        return key in self._shards[hash(key) % len(self._shards)]
+
+    def __iter__(self):
+        for stripe, shard in enumerate(self._shards):
+            with self.locks[stripe]:
+                keys = list(shard)
+            yield from keys
+
+    def __len__(self):
+        return sum(map(len, self._shards))
+
+    def update(self, items=(), **kwargs):
+        """Insert a batch, taking each stripe lock once."""
+        items = dict(items, **kwargs)
+        for stripe, keys in self._group(items).items():
+            with self.locks[stripe]:
+                self._shards[stripe].update(zip(keys, map(items.__getitem__, keys)))
+
+    def delete_many(self, keys):
+        """Delete a batch of keys, taking each stripe lock once. Missing keys are ignored."""
+        for stripe, group in self._group(keys).items():
+            shard = self._shards[stripe]
+            with self.locks[stripe]:
+                deque(map(shard.pop, group, repeat(None)), maxlen=0)
+
+    def snapshot(self):
+        """Return point-in-time copies of every shard."""
+        with ExitStack() as stack:
+            for lock in self.locks:
+                stack.enter_context(lock)
+            return tuple(shard.copy() for shard in self._shards)
+
+
+class DatabaseSnapshot(Mapping):
+    """
+    Read-only, point-in-time view of a Database returned by ``Database.snapshot``.
+
+    Reads never take locks and never observe writes made after the snapshot
+    was taken. A snapshot of a database with a blob tier pins the tier, so
+    ``Database.compact`` keeps the blob segments it references until the
+    snapshot is released with ``release`` or garbage collected.
+    """
+
+    def __init__(self, shards, blob_store=None):
+        self._shards = shards
+        self._blob_store = blob_store
+        if blob_store is not None:
+            blob_store.pin()
+            self._unpin = weakref.finalize(self, blob_store.unpin)
+        else:
+            self._unpin = lambda: None
+
+    def release(self):
+        """Let compaction delete the blob segments this snapshot still references."""
+        self._unpin()
+
+    def __getitem__(self, key):
+        value = self._shards[hash(key) % len(self._shards)][key]
+        if type(value) is BlobRef:
+            return self._blob_store.view(value)
+        return value
+
+    def __contains__(self, key):
+        return key in self._shards[hash(key) % len(self._shards)]
+
+    def __iter__(self):
+        for shard in self._shards:
+            yield from shard
+
+    def __len__(self):
+        return sum(map(len, self._shards))
+
+    def retrieve_data(self, key):
+        return self.get(key)
+
+    def retrieve_many(self, keys):
+        found = list(filter(self.__contains__, keys))
+        return dict(zip(found, map(self.__getitem__, found)))
+
+
+# Location of a value held in the blob tier
+BlobRef = namedtuple("BlobRef", ["segment", "offset", "length"])
+
+
+class BlobStore:
+    """
+    Append-only store for large binary values kept in memory-mapped segment files.
+
+    Values are appended to the active segment (a new one is started once
+    ``segment_size`` would be exceeded) and read back as ``memoryview``
+    slices of a read-only mapping of the segment, so reads never copy the
+    payload and the pages can be dropped by the OS under memory pressure
+    instead of counting against the process heap.
+
+    Overwritten and deleted payloads stay in their segment until ``compact``
+    is given the references that are still live. It copies the live payloads
+    out of mostly-dead segments and deletes those segment files. Views handed
+    out earlier stay valid, because their mappings outlive the deleted files.
+    While the store is pinned (see ``pin``) compacted segments are only
+    retired: references into them keep resolving until the last pin is
+    released, and the files are deleted then.
+
+    The store is thread-safe: an internal lock serializes offset reservation,
+    appends, segment roll-over and compaction, so writers holding different
+    database stripes never receive overlapping locations.
+
+    Parameters:
+    - directory (str): Directory holding the ``blob-NNNNNN.seg`` segment files.
+    - segment_size (int): Target maximum size of a segment in bytes.
+    """
+
+    def __init__(self, directory, segment_size=256 * 1024 * 1024):
+        self.directory = directory
+        self.segment_size = segment_size
+        self._fds = {}
+        self._sizes = {}
+        self._maps = {}
+        self._lock = threading.RLock()
+        self._pins = 0
+        self._retired = set()
+        os.makedirs(directory, exist_ok=True)
+        for name in sorted(os.listdir(directory)):
+            if name.startswith("blob-") and name.endswith(".seg"):
+                self._open_segment(int(name[5:-4]))
+        self._active = max(self._fds, default=-1)
+        if self._active < 0:
+            self._active = 0
+            self._open_segment(0)
+
+    def _open_segment(self, segment):
+        path = os.path.join(self.directory, f"blob-{segment:06d}.seg")
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._fds[segment] = fd
+        self._sizes[segment] = os.fstat(fd).st_size
+
+    def put(self, value):
+        """
+        Append a bytes-like value to the blob tier.
+
+        Parameters:
+        - value (bytes, bytearray or memoryview): The payload to store.
+
+        Returns:
+        - BlobRef: The location of the stored payload.
+        """
+        payload = memoryview(value).cast("B")
+        with self._lock:
+            size = self._sizes[self._active]
+            if size and size + payload.nbytes > self.segment_size:
+                self._active += 1
+                self._open_segment(self._active)
+                size = 0
+            _write_all(self._fds[self._active], payload)
+            self._sizes[self._active] = size + payload.nbytes
+            return BlobRef(self._active, size, payload.nbytes)
+
+    def compact(self, refs, ratio=0.5, commit=None):
+        """
+        Reclaim the space of dead payloads.
+
+        Every segment whose dead bytes make up at least ``ratio`` of its size
+        is rewritten: its live payloads are appended to a fresh segment and
+        the old file is deleted. Dead bytes are counted from ``refs``, so
+        nothing needs to be tracked between compactions or across restarts.
+
+        The steps are ordered so a crash never loses a payload: the new
+        segments are fsynced, then ``commit`` is called with the moved
+        references so the caller can durably repoint its keys, and only then
+        are the old segments deleted.
+
+        Parameters:
+        - refs (iterable): Every BlobRef still referenced by the database.
+        - ratio (float): Fraction of dead bytes that makes a segment worth rewriting.
+        - commit (callable, optional): Called with the moved references before
+          the old segments are deleted.
+
+        Returns:
+        - dict: Mapping of each moved BlobRef to its new location.
+        """
+        refs = list(refs)
+        with self._lock:
+            live = dict.fromkeys(self._sizes, 0)
+            for ref in refs:
+                live[ref.segment] += ref.length
+            victims = {segment for segment, size in self._sizes.items()
+                       if size and size - live[segment] >= ratio * size}
+            if not victims:
+                return {}
+            # Start a fresh segment so live payloads never land in a segment about to be deleted
+            first = self._active = max(self._fds) + 1
+            self._open_segment(self._active)
+            moved = {}
+            for ref in sorted(ref for ref in refs if ref.segment in victims):
+                if ref not in moved:
+                    moved[ref] = self.put(self.view(ref))
+            for segment in range(first, self._active + 1):
+                os.fsync(self._fds[segment])
+            self._sync_directory()
+            if commit is not None:
+                commit(moved)
+            for segment in victims:
+                del self._sizes[segment]
+            self._retired |= victims
+            if not self._pins:
+                self._delete_retired()
+            return moved
+
+    def pin(self):
+        """
+        Keep segments removed by ``compact`` readable until the matching ``unpin``.
+
+        Used by database snapshots, which hold references that compaction
+        does not know about.
+        """
+        with self._lock:
+            self._pins += 1
+
+    def unpin(self):
+        """Release a ``pin``; retired segments are deleted once no pin is left."""
+        with self._lock:
+            self._pins -= 1
+            if not self._pins and self._fds:
+                self._delete_retired()
+
+    def _delete_retired(self):
+        for segment in self._retired:
+            os.close(self._fds.pop(segment))
+            # Outstanding views keep the old mapping alive; it is released with them
+            self._maps.pop(segment, None)
+            os.remove(os.path.join(self.directory, f"blob-{segment:06d}.seg"))
+        self._retired = set()
+        self._sync_directory()
+
+    def _sync_directory(self):
+        # Make segment creation and removal durable, not just the segment contents
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def view(self, ref):
+        """Return a zero-copy, read-only ``memoryview`` of the payload at ``ref``."""
+        mapping = self._maps.get(ref.segment)
+        if mapping is None or len(mapping) < ref.offset + ref.length:
+            with self._lock:
+                mapping = self._maps.get(ref.segment)
+                if mapping is None or len(mapping) < ref.offset + ref.length:
+                    # The segment grew since it was mapped; older views keep the old mapping alive
+                    mapping = mmap.mmap(self._fds[ref.segment], 0, access=mmap.ACCESS_READ)
+                    self._maps[ref.segment] = mapping
+        return memoryview(mapping)[ref.offset:ref.offset + ref.length]
+
+    def close(self):
+        """Release the segment mappings and file handles."""
+        with self._lock:
+            for mapping in self._maps.values():
+                try:
+                    mapping.close()
+                except BufferError:
+                    # Still exported through a live memoryview; released on garbage collection
+                    pass
+            for fd in self._fds.values():
+                os.close(fd)
+            self._maps = {}
+            self._fds = {}
+
+
+def _prefix_upper_bound(prefix):
+    # Smallest key greater than every key starting with ``prefix`` (None if unbounded)
+    if isinstance(prefix, str):
+        stripped = prefix.rstrip(chr(0x10FFFF))
+        return stripped[:-1] + chr(ord(stripped[-1]) + 1) if stripped else None
+    stripped = bytes(prefix).rstrip(b"\xff")
+    return stripped[:-1] + bytes([stripped[-1] + 1]) if stripped else None
+
+
+class SortedKeyIndex:
+    """
+    Ordered secondary index over database keys for range and prefix scans.
+
+    Keys are kept in a sorted list searched with ``bisect``. Additions and
+    removals are buffered and folded in the next time the index is queried:
+    a small batch is inserted with ``bisect``, a large one is sorted on its
+    own and merged with the existing keys in one linear pass, and removals
+    are dropped during that pass. Bulk loads and bulk deletes therefore never
+    pay a per-key cost proportional to the index size. Duplicate additions
+    are dropped on merge. Keys must be mutually orderable, e.g. all strings
+    or all timestamps.
+    """
+
+    # Pending additions up to this count are inserted one by one instead of merged
+    INSORT_LIMIT = 64
+
+    def __init__(self, keys=()):
+        self._keys = sorted(keys)
+        self._pending = []
+        self._removed = set()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        with self._lock:
+            self._removed.discard(key)
+            self._pending.append(key)
+
+    def update(self, keys):
+        with self._lock:
+            if self._removed:
+                keys = list(keys)
+                self._removed.difference_update(keys)
+            self._pending.extend(keys)
+
+    def discard(self, key):
+        with self._lock:
+            self._removed.add(key)
+
+    def discard_many(self, keys):
+        with self._lock:
+            self._removed.update(keys)
+
+    def _merge(self):
+        keys, pending, removed = self._keys, self._pending, self._removed
+        if pending and len(pending) <= self.INSORT_LIMIT:
+            for key in pending:
+                position = bisect_left(keys, key)
+                if position == len(keys) or keys[position] != key:
+                    keys.insert(position, key)
+            pending = []
+        if pending:
+            pending.sort()
+            merged = heapq.merge(keys, pending)
+            if removed:
+                merged = filterfalse(removed.__contains__, merged)
+            self._keys = [key for key, _ in groupby(merged)]
+        elif removed:
+            self._keys = list(filterfalse(removed.__contains__, keys))
+        self._pending = []
+        self._removed = set()
+
+    def range(self, start=None, stop=None):
+        """Return the keys ``k`` with ``start <= k < stop`` in sorted order."""
+        with self._lock:
+            self._merge()
+            low = 0 if start is None else bisect_left(self._keys, start)
+            high = len(self._keys) if stop is None else bisect_left(self._keys, stop)
+            return self._keys[low:high]
+
+    def prefix(self, prefix):
+        """Return the keys starting with ``prefix`` (str or bytes) in sorted order."""
+        return self.range(prefix, _prefix_upper_bound(prefix))
+
+    def __len__(self):
+        with self._lock:
+            self._merge()
+            return len(self._keys)
+
+
 class Database:
-    def __init__(self):
-        self.data = {}
+    def __init__(self, path=None, sync=False, blob_path=None, blob_threshold=64 * 1024, cache=None,
+                 concurrent=False, stripes=16):
+        """
+        Initialize the database.
+
+        Parameters:
+        - path (str, optional): Log file for durable storage. When omitted the
+          data lives in a plain in-memory dict and is lost on exit.
+        - sync (bool): Fsync every write when running in durable mode.
+        - blob_path (str, optional): Directory for the memory-mapped blob tier.
+          Bytes-like values of at least ``blob_threshold`` bytes are stored
+          there and retrieved as zero-copy ``memoryview`` objects.
+        - blob_threshold (int): Minimum size in bytes of values sent to the blob tier.
+        - cache (CacheTier, optional): Bounded cache kept in front of the store so
+          hot keys are served from memory and cold ones are read from the log.
+        - concurrent (bool): Make the database safe to share between threads. Each
+          key operation holds one of ``stripes`` locks chosen by key hash, and the
+          in-memory store is sharded to match, so unrelated keys never contend.
+        - stripes (int): Number of lock stripes used in concurrent mode.
+        """
+        if path is not None:
+            self.data = LogStructuredStore(path, sync=sync)
+        elif concurrent:
+            self.data = StripedStore(stripes)
+        else:
+            self.data = {}
+        if isinstance(self.data, StripedStore):
+            self._stripes = self.data.locks
+        elif concurrent:
+            self._stripes = tuple(threading.RLock() for _ in range(stripes))
+        else:
+            self._stripes = None
+        self.blob_store = None if blob_path is None else BlobStore(blob_path)
+        self.blob_threshold = blob_threshold
+        self.cache = cache
+        # Built on the first range or prefix scan, then kept in sync
+        self._ordered_index = None
+        self._ordered_index_lock = threading.Lock()
+
+    def _lock_for(self, key):
+        if self._stripes is None:
+            return _NO_LOCK
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    @contextmanager
+    def _locks_for(self, keys=None):
+        # Hold the stripes of every key (all stripes when ``keys`` is None), taken in
+        # index order so concurrent batches cannot deadlock with each other
+        if self._stripes is None:
+            yield
+            return
+        count = len(self._stripes)
+        stripes = range(count) if keys is None else sorted({hash(key) % count for key in keys})
+        with ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._stripes[stripe])
+            yield
+
+    def _sorted_keys(self):
+        index = self._ordered_index
+        if index is None:
+            with self._ordered_index_lock:
+                if self._ordered_index is None:
+                    # No write may land between reading the keys and publishing the index
+                    with self._locks_for():
+                        self._ordered_index = SortedKeyIndex(self.data)
+                index = self._ordered_index
+        return index
+
+    def _stage(self, value):
+        # Large bytes-like values go to the blob tier; the store keeps only their location
+        if (self.blob_store is not None and isinstance(value, (bytes, bytearray, memoryview))
+                and memoryview(value).nbytes >= self.blob_threshold):
+            return self.blob_store.put(value)
+        return value
+
+    def _get(self, key, default=None):
+        if self.cache is not None:
+            value = self.cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        value = self.data.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        if type(value) is BlobRef:
+            value = self.blob_store.view(value)
+        if self.cache is not None:
+            self.cache.put(key, value)
+        return value
 
     def insert_data(self, key, value):
         # Placeholder for inserting data into the database
-        self.data[key] = value
-        print(f"Data with key '{key}' has been inserted into the database.")
+        with self._lock_for(key):
+            if self._ordered_index is not None and key not in self.data:
+                self._ordered_index.add(key)
+            self.data[key] = self._stage(value)
+            if self.cache is not None:
+                self.cache.invalidate(key)
+        _events.info("insert", "Data with key '%(key)s' has been inserted into the database.", key=key)
 
     def retrieve_data(self, key):
         # Placeholder for retrieving data from the database
-        if key in self.data:
-            print(f"Retrieving data with key '{key}': {self.data[key]}")
-            return self.data[key]
+        with self._lock_for(key):
+            value = self._get(key, _MISSING)
+        if value is not _MISSING:
+            _events.info("retrieve", "Retrieving data with key '%(key)s': %(value)s", key=key, value=value)
+            return value
         else:
-            print(f"Error: Data with key '{key}' not found.")
+            _events.warning("not_found", "Error: Data with key '%(key)s' not found.", key=key)
             return None
 
     def delete_data(self, key):
         # Placeholder for deleting data from the database
-        if key in self.data:
-            del self.data[key]
-            print(f"Data with key '{key}' has been deleted from the database.")
+        with self._lock_for(key):
+            deleted = key in self.data
+            if deleted:
+                del self.data[key]
+                if self.cache is not None:
+                    self.cache.invalidate(key)
+                if self._ordered_index is not None:
+                    self._ordered_index.discard(key)
+        if deleted:
+            _events.info("delete", "Data with key '%(key)s' has been deleted from the database.", key=key)
         else:
-            print(f"Error: Data with key '{key}' not found.")
+            _events.warning("not_found", "Error: Data with key '%(key)s' not found.", key=key)
+
+    def insert_many(self, items):
+        """
+        Insert many key/value pairs in one batch without per-key console output.
+
+        Parameters:
+        - items (dict or iterable): Mapping or iterable of (key, value) pairs.
+
+        Returns:
+        - int: The number of pairs inserted.
+        """
+        items = dict(items)
+        with self._locks_for(items):
+            if self.blob_store is not None:
+                items = {key: self._stage(value) for key, value in items.items()}
+            if self._ordered_index is not None:
+                self._ordered_index.update(filterfalse(self.data.__contains__, items))
+            self.data.update(items)
+            if self.cache is not None:
+                deque(map(self.cache.invalidate, items), maxlen=0)
+        return len(items)
+
+    def retrieve_many(self, keys):
+        """
+        Retrieve many keys in one batch without per-key console output.
+
+        Parameters:
+        - keys (iterable): Keys to look up.
+
+        Returns:
+        - dict: Mapping of every key that was found to its value. Missing keys are omitted.
+        """
+        keys = list(keys)
+        with self._locks_for(keys):
+            found = list(filter(self.data.__contains__, keys))
+            return dict(zip(found, map(self._get, found)))
+
+    def delete_many(self, keys):
+        """
+        Delete many keys in one batch without per-key console output.
+
+        Parameters:
+        - keys (iterable): Keys to delete. Keys that do not exist are ignored.
+
+        Returns:
+        - int: The number of keys deleted.
+        """
+        keys = list(keys)
+        with self._locks_for(keys):
+            found = list(filter(self.data.__contains__, keys))
+            if isinstance(self.data, (LogStructuredStore, StripedStore)):
+                self.data.delete_many(found)
+            else:
+                # Drain the map at C speed instead of looping in Python
+                deque(map(self.data.__delitem__, found), maxlen=0)
+            if self.cache is not None:
+                deque(map(self.cache.invalidate, found), maxlen=0)
+            if self._ordered_index is not None:
+                self._ordered_index.discard_many(found)
+        return len(found)
+
+    def scan_range(self, start=None, stop=None):
+        """
+        Return the entries with ``start <= key < stop`` in key order.
+
+        Parameters:
+        - start (optional): Inclusive lower bound, or None for the first key.
+        - stop (optional): Exclusive upper bound, or None for the last key.
+
+        Returns:
+        - list: (key, value) pairs sorted by key.
+        """
+        keys = self._sorted_keys().range(start, stop)
+        return list(zip(keys, map(self._get, keys)))
+
+    def scan_prefix(self, prefix):
+        """
+        Return the entries whose key starts with ``prefix`` in key order.
+
+        Parameters:
+        - prefix (str or bytes): Key prefix to match.
+
+        Returns:
+        - list: (key, value) pairs sorted by key.
+        """
+        keys = self._sorted_keys().prefix(prefix)
+        return list(zip(keys, map(self._get, keys)))
+
+    def snapshot(self):
+        """
+        Return a read-only, point-in-time view of an in-memory database.
+
+        In concurrent mode the stripes are locked only long enough to copy the
+        shards, after which readers of the snapshot never block writers.
+
+        Returns:
+        - DatabaseSnapshot: Mapping supporting ``retrieve_data`` and ``retrieve_many``.
+        """
+        if isinstance(self.data, StripedStore):
+            return DatabaseSnapshot(self.data.snapshot(), self.blob_store)
+        if isinstance(self.data, dict):
+            return DatabaseSnapshot((self.data.copy(),), self.blob_store)
+        raise ValueError("Snapshots are only available for in-memory databases.")
+
+    def compact(self):
+        """
+        Reclaim space left by overwritten and deleted values.
+
+        Mostly-dead blob segments are rewritten and their keys pointed at the
+        new locations, which are flushed to the log and evicted from the cache
+        before the old segments are deleted. Segments still referenced by a
+        live snapshot are kept until it is released. The write-ahead log is
+        then compacted when running in durable mode. In concurrent mode every
+        stripe is held while blobs move.
+        """
+        if self.blob_store is not None:
+            with self._locks_for():
+                refs = {key: value for key, value in self.data.items() if type(value) is BlobRef}
+
+                def commit(moved):
+                    # The keys must durably point at the new copies before the old segments go
+                    relocated = {key: moved[ref] for key, ref in refs.items() if ref in moved}
+                    self.data.update(relocated)
+                    if isinstance(self.data, LogStructuredStore):
+                        self.data.flush()
+                    if self.cache is not None:
+                        deque(map(self.cache.invalidate, relocated), maxlen=0)
+
+                self.blob_store.compact(refs.values(), commit=commit)
+        if isinstance(self.data, LogStructuredStore):
+            self.data.compact()
+
+    def close(self):
+        """Persist the index and close the log and blob tier when they are in use."""
+        if isinstance(self.data, LogStructuredStore):
+            self.data.close()
+        if self.blob_store is not None:
+            self.blob_store.close()
+
+def benchmark_concurrent_access(thread_counts=(1, 2, 4, 8), operations=200000, stripes=16, read_ratio=0.8):
+    """
+    Measure concurrent-mode throughput as the number of worker threads grows.
+
+    Each configuration runs the same mixed read/write workload against a
+    database with a single global lock (one stripe) and with ``stripes``
+    lock stripes. Database events are silenced while the workload runs.
+
+    Parameters:
+    - thread_counts (tuple): Thread counts to measure.
+    - operations (int): Total operations per run, split evenly across threads.
+    - stripes (int): Stripe count for the striped configuration.
+    - read_ratio (float): Fraction of operations that are reads.
+
+    Returns:
+    - dict: Mapping of (stripe count, thread count) to operations per second.
+    """
+    results = {}
+    keys = [f"telemetry/{i:06d}" for i in range(10000)]
+    for stripe_count in (1, stripes):
+        for threads in thread_counts:
+            database = Database(concurrent=True, stripes=stripe_count)
+            database.insert_many(dict.fromkeys(keys, 0.0))
+            per_thread = operations // threads
+
+            def worker(offset):
+                for i in range(per_thread):
+                    key = keys[(offset + i * 7919) % len(keys)]
+                    if i % 100 < read_ratio * 100:
+                        database.retrieve_data(key)
+                    else:
+                        database.insert_data(key, float(i))
+
+            workers = [threading.Thread(target=worker, args=(n * 1013,)) for n in range(threads)]
+            with silenced():
+                start = time.perf_counter()
+                for thread in workers:
+                    thread.start()
+                for thread in workers:
+                    thread.join()
+                elapsed = time.perf_counter() - start
+            results[(stripe_count, threads)] = per_thread * threads / elapsed
+            print(f"stripes={stripe_count:<3} threads={threads:<3} {results[(stripe_count, threads)]:>12,.0f} ops/s")
+    return results
 
 # Example usage:
 if __name__ == "__main__":
@@ -41,3 +996,84 @@ if __name__ == "__main__":
 
     # Delete data from the database
     database.delete_data("status")
+
+    # Bulk-load telemetry and query a time window
+    database.insert_many((f"telemetry/{t:06d}", t * 0.5) for t in range(10000))
+    window = database.scan_range("telemetry/000100", "telemetry/000110")
+    print(f"Telemetry window: {window}")
+    database.delete_many(key for key, _ in database.scan_prefix("telemetry/"))
+
+    # Durable mode keeps the data across restarts
+    durable_database = Database(path="talon_database.log")
+    durable_database.insert_data("mission", "TALON telemetry")
+    durable_database.close()
+
+    reopened_database = Database(path="talon_database.log")
+    mission = reopened_database.retrieve_data("mission")
+    reopened_database.close()
+
+    # Keep the hottest telemetry in a bounded cache in front of the log
+    cached_database = Database(path="talon_database.log", cache=CacheTier(max_entries=1000, default_ttl=300))
+    cached_database.retrieve_data("mission")
+    cached_database.retrieve_data("mission")
+    print(f"Cache stats: {cached_database.cache.stats()}")
+    cached_database.close()
+
+    # Share one database between worker threads and read from a consistent snapshot
+    concurrent_database = Database(concurrent=True, stripes=32)
+    concurrent_database.insert_many({f"sensor/{i:04d}": i for i in range(100)})
+    snapshot = concurrent_database.snapshot()
+    concurrent_database.delete_many(snapshot)
+    print(f"Snapshot still holds {len(snapshot)} readings; live database holds {len(concurrent_database.data)}")
+    benchmark_concurrent_access(thread_counts=(1, 2, 4), operations=30000)
+
+    # Writers on different stripes share the blob tier without overlapping payloads
+    shared_blobs = Database(concurrent=True, stripes=8, blob_path="talon_shared_blobs", blob_threshold=1024)
+    shared_blobs.blob_store.segment_size = 1024 * 1024  # Small segments so writers race across roll-overs
+
+    def write_frames(writer):
+        frames = {f"camera{writer}/{frame:03d}": bytes([writer, frame]) * 8192 for frame in range(64)}
+        with silenced():
+            for key, payload in list(frames.items())[:32]:
+                shared_blobs.insert_data(key, payload)
+        shared_blobs.insert_many(list(frames.items())[32:])
+        return frames
+
+    writers = [threading.Thread(target=lambda writer=writer: expected.update(write_frames(writer))) for writer in range(8)]
+    expected = {}
+    for thread in writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stored = shared_blobs.retrieve_many(expected)
+    assert all(bytes(stored[key]) == payload for key, payload in expected.items())
+    print(f"Concurrent blob writers stored {len(stored)} frames intact across "
+          f"{len(shared_blobs.blob_store._sizes)} segments")
+    shared_blobs.close()
+
+    # Large sensor frames are kept in the memory-mapped blob tier
+    blob_database = Database(path="talon_database.log", blob_path="talon_blobs")
+    blob_database.insert_data("frame-0001", bytes(4 * 1024 * 1024))
+    frame = blob_database.retrieve_data("frame-0001")
+    print(f"Sensor frame size: {frame.nbytes} bytes")
+    frame.release()
+
+    # Overwritten frames leave dead payloads behind until the database is compacted
+    for revision in range(4):
+        blob_database.insert_data("frame-0001", bytes([revision]) * (4 * 1024 * 1024))
+    blob_database.compact()
+    blob_bytes = sum(blob_database.blob_store._sizes.values())
+    print(f"Blob tier after compaction: {blob_bytes} bytes, frame intact: "
+          f"{bytes(blob_database.retrieve_data('frame-0001')) == bytes([3]) * (4 * 1024 * 1024)}")
+    blob_database.close()
+
+    # Snapshots keep the blob segments they reference alive across compaction
+    archive = Database(blob_path="talon_archive_blobs", blob_threshold=1024)
+    archive.insert_data("frame-0002", bytes([1]) * 65536)
+    archived = archive.snapshot()
+    archive.insert_data("frame-0002", bytes([2]) * 65536)
+    archive.compact()
+    assert bytes(archived["frame-0002"]) == bytes([1]) * 65536
+    archived.release()
+    assert len(os.listdir("talon_archive_blobs")) == 1
+    archive.close()
@@ -4,12 +4,400 @@ from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 from Crypto.Protocol.KDF import PBKDF2
 from Crypto.Util.Padding import pad, unpad
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
+import hmac
+import os
+import struct
+import threading
+import time
+
+# Ciphertext header: magic, PBKDF2 iteration count, salt, then IV and ciphertext as before
+MAGIC = b'TLN1'
+SALT_SIZE = 16
+DEFAULT_ITERATIONS = 1000000
+_HEADER = struct.Struct(f'>4sI{SALT_SIZE}s')
+# Legacy ciphertexts are IV + padded blocks, so their length is a multiple of 16; headered ones are not
+_LEGACY_SALT = b'salt'
+
+# Streams: magic, iteration count, salt and a random nonce prefix, then length-prefixed AES-GCM frames
+STREAM_MAGIC = b'TLS1'
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# Largest plaintext chunk per frame; the length field is read before the frame is authenticated
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+TAG_SIZE = 16
+_STREAM_HEADER = struct.Struct(f'>4sI{SALT_SIZE}s7s')
+_FRAME_LENGTH = struct.Struct('>I')
+# Chunk nonce: 7-byte prefix, 4-byte chunk counter, 1-byte last-chunk flag
+_NONCE_SUFFIX = struct.Struct('>IB')
+
+
+class KeyDerivationManager:
+    """
+    Process-wide cache of PBKDF2-derived AES keys.
+
+    Keys are cached by (passphrase fingerprint, salt, iteration count, key
+    length). The fingerprint is an HMAC of the passphrase under a random
+    per-process secret, so the cache never holds passphrases. The manager
+    also hands out one random salt per passphrase through ``salt_for``, so
+    instances built for the same passphrase share a cache entry. The cache
+    keeps at most ``max_entries`` keys in least-recently-used order. Cached
+    keys are held in bytearrays, which are overwritten with zeros when
+    evicted or cleared. ``derive`` returns immutable copies, and zeroization
+    cannot reach those copies: a key handed out stays in memory until the
+    caller drops it.
+
+    Parameters:
+    - max_entries (int): Maximum number of cached derived keys.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.derivations = 0
+        self._secret = get_random_bytes(32)
+        self._keys = OrderedDict()
+        self._salts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fingerprint(self, passphrase):
+        if isinstance(passphrase, str):
+            passphrase = passphrase.encode('utf-8')
+        return hmac.new(self._secret, passphrase, hashlib.sha256).digest()
+
+    def salt_for(self, fingerprint):
+        """Return the salt for new ciphertexts under the passphrase with ``fingerprint``, drawing it on first use."""
+        with self._lock:
+            salt = self._salts.get(fingerprint)
+            if salt is None:
+                salt = self._salts[fingerprint] = get_random_bytes(SALT_SIZE)
+                while len(self._salts) > self.max_entries:
+                    self._salts.popitem(last=False)
+            else:
+                self._salts.move_to_end(fingerprint)
+            return salt
+
+    def derive(self, passphrase, salt, iterations=DEFAULT_ITERATIONS, key_length=32, fingerprint=None):
+        """
+        Return the key derived from ``passphrase`` and ``salt``, running PBKDF2 only on a cache miss.
+
+        Parameters:
+        - passphrase (str or bytes): The passphrase.
+        - salt (bytes): The salt.
+        - iterations (int): PBKDF2 iteration count.
+        - key_length (int): Key length in bytes.
+        - fingerprint (bytes, optional): Precomputed ``fingerprint(passphrase)``.
+
+        Returns:
+        - bytes: A copy of the derived key, which ``clear`` and eviction do not zeroize.
+        """
+        if fingerprint is None:
+            fingerprint = self.fingerprint(passphrase)
+        cache_key = (fingerprint, bytes(salt), iterations, key_length)
+        with self._lock:
+            key = self._keys.get(cache_key)
+            if key is not None:
+                self._keys.move_to_end(cache_key)
+                return bytes(key)
+        # Derive outside the lock so one slow derivation does not block cache hits
+        key = bytearray(PBKDF2(passphrase, salt=salt, dkLen=key_length, count=iterations, hmac_hash_module=hashlib.sha256))
+        with self._lock:
+            self.derivations += 1
+            if cache_key not in self._keys:
+                self._keys[cache_key] = key
+                while len(self._keys) > self.max_entries:
+                    _zeroize(self._keys.popitem(last=False)[1])
+            return bytes(self._keys[cache_key])
+
+    def clear(self):
+        """Zeroize and drop every cached key, and forget the per-passphrase salts."""
+        with self._lock:
+            for key in self._keys.values():
+                _zeroize(key)
+            self._keys.clear()
+            self._salts.clear()
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def _zeroize(key):
+    key[:] = bytes(len(key))
+
+
+default_key_manager = KeyDerivationManager()
+
+
+def _read_exact(read, size, allow_eof=False):
+    # Read exactly ``size`` bytes; an empty result is allowed at a clean end of stream
+    data = read(size)
+    if len(data) == size:
+        return data
+    data = bytearray(data)
+    while len(data) < size:
+        part = read(size - len(data))
+        if not part:
+            break
+        data += part
+    if len(data) < size and not (allow_eof and not data):
+        raise ValueError("Truncated encrypted stream.")
+    return data
+
+
+def _read_chunks(source, chunk_size):
+    # Two alternating buffers: a chunk stays valid while the next one is read
+    buffers = (bytearray(chunk_size), bytearray(chunk_size))
+    index = 0
+    while True:
+        view = memoryview(buffers[index % 2])
+        size = source.readinto(view)
+        if not size:
+            return
+        yield view[:size]
+        index += 1
+
+
+class _ChunkReader:
+    # File-like ``read`` over an iterable of bytes-like chunks, slicing without copying
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = memoryview(b'')
+
+    def read(self, size):
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return b''
+            self._buffer = memoryview(chunk).cast('B')
+        data = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return data
+
 
 class Encryption:
-    def __init__(self, key):
-        # Derive a 256-bit key from the provided passphrase using PBKDF2
-        self.key = PBKDF2(key, salt=b'salt', dkLen=32, count=1000000, hmac_hash_module=hashlib.sha256)
+    """
+    AES-256-CBC encryption with a passphrase-derived key.
+
+    Each passphrase gets a random salt from the key manager, shared by every
+    instance built from it. Every ciphertext carries a header with that salt
+    and the PBKDF2 iteration count, so any instance built from the same
+    passphrase can decrypt it. Derived keys come from a shared
+    ``KeyDerivationManager``. Building ``Encryption`` objects per request
+    therefore pays the full KDF cost only once per passphrase. Ciphertexts in the
+    original headerless format, derived with the fixed salt ``b'salt'``, can
+    still be decrypted.
+
+    Large payloads can be encrypted with the streaming API instead. It uses
+    chunked AES-GCM framing, where each chunk is authenticated separately and
+    memory use stays constant. Chunk nonces combine a random per-stream prefix,
+    the chunk counter and a last-chunk flag. Reordered, dropped or truncated
+    chunks therefore fail authentication.
+
+    Parameters:
+    - key (str or bytes): The passphrase.
+    - salt (bytes, optional): Salt for new ciphertexts. Defaults to the key manager's random 16-byte salt for this passphrase.
+    - iterations (int): PBKDF2 iteration count for new ciphertexts.
+    - key_manager (KeyDerivationManager, optional): Key cache to use. Defaults to the process-wide one.
+    - accepted_iterations (iterable, optional): Iteration counts accepted from ciphertext headers.
+      The header is read before anything is authenticated, so other counts are rejected
+      instead of being run through PBKDF2. Defaults to ``iterations`` and ``DEFAULT_ITERATIONS``.
+    """
+
+    def __init__(self, key, salt=None, iterations=DEFAULT_ITERATIONS, key_manager=None, accepted_iterations=None):
+        self.key_manager = key_manager if key_manager is not None else default_key_manager
+        self._passphrase = key
+        self._fingerprint = self.key_manager.fingerprint(key)
+        self.salt = salt if salt is not None else self.key_manager.salt_for(self._fingerprint)
+        if len(self.salt) != SALT_SIZE:
+            raise ValueError(f"Salt must be {SALT_SIZE} bytes.")
+        self.iterations = iterations
+        self.accepted_iterations = frozenset(accepted_iterations if accepted_iterations is not None
+                                             else (iterations, DEFAULT_ITERATIONS))
+        self._header = _HEADER.pack(MAGIC, iterations, self.salt)
+        # Derive the 256-bit key up front so the first encrypt call is not the slow one. The
+        # instance keeps its own key, so churn in the shared cache never forces a re-derivation
+        self._key = self.key_manager.derive(key, self.salt, iterations, fingerprint=self._fingerprint)
+
+    @property
+    def key(self):
+        return self._key
+
+    def _derive_key(self, salt, iterations):
+        if iterations == self.iterations and salt == self.salt:
+            return self._key
+        return self.key_manager.derive(self._passphrase, salt, iterations, fingerprint=self._fingerprint)
+
+    def _header_key(self, salt, iterations):
+        # Header fields are unauthenticated, so a forged count must not buy an arbitrarily long PBKDF2 run
+        if iterations not in self.accepted_iterations:
+            raise ValueError(f"Unsupported PBKDF2 iteration count {iterations} in header.")
+        return self._derive_key(salt, iterations)
+
+    def _key_for(self, ciphertext):
+        # Returns the key and the offset of the IV within ``ciphertext``
+        if len(ciphertext) % 16 == _HEADER.size % 16 and bytes(ciphertext[:len(MAGIC)]) == MAGIC:
+            _, iterations, salt = _HEADER.unpack_from(ciphertext)
+            return self._header_key(salt, iterations), _HEADER.size
+        return self._derive_key(_LEGACY_SALT, DEFAULT_ITERATIONS), 0
+
+    def encrypt_many(self, plaintexts, workers=None, batch_size=256):
+        """
+        Encrypt many records in parallel, returning ciphertexts in input order.
+
+        Records are split into batches that run on a thread pool. PyCryptodome
+        releases the GIL inside its C cipher routines. The derived key is looked
+        up once per call and the IVs are drawn once per batch. The cipher
+        objects themselves are single-use, because CBC state depends on the IV.
+
+        Parameters:
+        - plaintexts (list): The strings to encrypt.
+        - workers (int, optional): Number of worker threads. Defaults to the CPU count.
+        - batch_size (int): Records per task.
+
+        Returns:
+        - list: Ciphertexts in the same format as ``encrypt``.
+        """
+        key = self.key
+        header = self._header
+
+        def encrypt_batch(batch):
+            ivs = get_random_bytes(16 * len(batch))
+            ciphertexts = []
+            for index, plaintext in enumerate(batch):
+                iv = ivs[16 * index:16 * index + 16]
+                cipher = AES.new(key, AES.MODE_CBC, iv)
+                ciphertexts.append(header + iv + cipher.encrypt(pad(plaintext.encode('utf-8'), 16)))
+            return ciphertexts
+
+        return self._map_batches(encrypt_batch, plaintexts, workers, batch_size)
+
+    def decrypt_many(self, ciphertexts, workers=None, batch_size=256):
+        """
+        Decrypt many records in parallel, returning plaintexts in input order.
+
+        Parameters:
+        - ciphertexts (list): Ciphertexts produced by ``encrypt`` or ``encrypt_many``.
+        - workers (int, optional): Number of worker threads. Defaults to the CPU count.
+        - batch_size (int): Records per task.
+
+        Returns:
+        - list: The decrypted strings.
+        """
+        return self._map_batches(lambda batch: [self.decrypt(ciphertext) for ciphertext in batch],
+                                 ciphertexts, workers, batch_size)
+
+    @staticmethod
+    def _map_batches(function, records, workers, batch_size):
+        records = list(records)
+        batches = [records[start:start + batch_size] for start in range(0, len(records), batch_size)]
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(batches) <= 1:
+            results = map(function, batches)
+            return [result for batch in results for result in batch]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return [result for batch in pool.map(function, batches) for result in batch]
+
+    def _stream_cipher(self, key, header, nonce_prefix, index, final):
+        if index >= 2 ** 32:
+            raise ValueError("Stream has too many chunks; use a larger chunk size.")
+        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce_prefix + _NONCE_SUFFIX.pack(index, final))
+        cipher.update(header)
+        return cipher
+
+    def encrypt_chunks(self, chunks):
+        """
+        Encrypt an iterable of plaintext chunks as an authenticated stream.
+
+        Parameters:
+        - chunks (iterable): Bytes-like chunks (bytes, bytearray or memoryview) of at most
+          ``MAX_CHUNK_SIZE`` bytes. Each becomes one frame.
+
+        Returns:
+        - generator: The stream header followed by one encrypted frame per chunk.
+        """
+        key = self.key
+        nonce_prefix = get_random_bytes(7)
+        header = _STREAM_HEADER.pack(STREAM_MAGIC, self.iterations, self.salt, nonce_prefix)
+        yield header
+
+        def seal(chunk, index, final):
+            chunk = memoryview(chunk).cast('B')
+            if len(chunk) > MAX_CHUNK_SIZE:
+                raise ValueError(f"Stream chunks must not exceed {MAX_CHUNK_SIZE} bytes.")
+            ciphertext, tag = self._stream_cipher(key, header, nonce_prefix, index, final).encrypt_and_digest(chunk)
+            return _FRAME_LENGTH.pack(len(chunk)) + ciphertext + tag
+
+        # Hold one chunk back so the last one can be flagged as final
+        pending = b''
+        index = 0
+        for chunk in chunks:
+            if index:
+                yield seal(pending, index - 1, False)
+            pending = chunk
+            index += 1
+        yield seal(pending, max(index - 1, 0), True)
+
+    def decrypt_chunks(self, chunks):
+        """
+        Decrypt an authenticated stream supplied as an iterable of bytes-like pieces.
+
+        The pieces need not line up with frame boundaries.
+
+        Parameters:
+        - chunks (iterable): The encrypted stream in pieces of any size.
+
+        Returns:
+        - generator: Verified plaintext chunks. A ValueError is raised on tampering or truncation.
+        """
+        return self._open_frames(_ChunkReader(chunks).read)
+
+    def encrypt_stream(self, source, destination, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Encrypt a binary file-like ``source`` into ``destination`` with constant memory.
+
+        Parameters:
+        - source: Readable binary file object supporting ``readinto``.
+        - destination: Writable binary file object.
+        - chunk_size (int): Plaintext bytes per frame, at most ``MAX_CHUNK_SIZE``.
+        """
+        for frame in self.encrypt_chunks(_read_chunks(source, chunk_size)):
+            destination.write(frame)
+
+    def decrypt_stream(self, source, destination):
+        """
+        Decrypt a stream written by ``encrypt_stream`` from ``source`` into ``destination``.
+
+        Plaintext is written only after its chunk has been authenticated.
+
+        Parameters:
+        - source: Readable binary file object.
+        - destination: Writable binary file object.
+        """
+        for plaintext in self._open_frames(source.read):
+            destination.write(plaintext)
+
+    def _open_frames(self, read):
+        header = bytes(_read_exact(read, _STREAM_HEADER.size))
+        magic, iterations, salt, nonce_prefix = _STREAM_HEADER.unpack(header)
+        if magic != STREAM_MAGIC:
+            raise ValueError("Data is not an encrypted stream.")
+        key = self._header_key(salt, iterations)
+        length_field = _read_exact(read, _FRAME_LENGTH.size)
+        index = 0
+        while True:
+            (length,) = _FRAME_LENGTH.unpack(length_field)
+            if length > MAX_CHUNK_SIZE:
+                # Refuse before allocating: a forged length could otherwise ask for 4 GiB
+                raise ValueError("Stream frame exceeds the maximum chunk size.")
+            frame = memoryview(_read_exact(read, length + TAG_SIZE))
+            # The last frame is the one followed by the end of the stream
+            length_field = _read_exact(read, _FRAME_LENGTH.size, allow_eof=True)
+            final = not length_field
+            cipher = self._stream_cipher(key, header, nonce_prefix, index, final)
+            yield cipher.decrypt_and_verify(frame[:length], frame[length:])
+            if final:
+                return
+            index += 1
 
     def encrypt(self, plaintext):
         # Generate a random 16-byte IV (Initialization Vector)
@@ -22,22 +410,47 @@ class Encryption:
         padded_plaintext = pad(plaintext.encode('utf-8'), 16)
         ciphertext = cipher.encrypt(padded_plaintext)
 
-        # Concatenate the IV with the ciphertext for storage
-        return iv + ciphertext
+        # Prefix the salt header and IV to the ciphertext for storage
+        return self._header + iv + ciphertext
 
     def decrypt(self, ciphertext):
-        # Extract the IV from the ciphertext
-        iv = ciphertext[:16]
+        # Look up the key for the salt in the header and extract the IV
+        key, offset = self._key_for(ciphertext)
+        iv = ciphertext[offset:offset + 16]
 
         # Create the AES cipher in CBC mode with the derived key and IV
-        cipher = AES.new(self.key, AES.MODE_CBC, iv)
+        cipher = AES.new(key, AES.MODE_CBC, iv)
 
         # Decrypt the ciphertext and remove the padding
-        decrypted_data = cipher.decrypt(ciphertext[16:])
+        decrypted_data = cipher.decrypt(ciphertext[offset + 16:])
         plaintext = unpad(decrypted_data, 16)
 
         return plaintext.decode('utf-8')
 
+def benchmark_bulk_encryption(worker_counts=(1, 2, 4, 8), records=20000, record_size=1024, batch_size=256):
+    """
+    Measure ``encrypt_many`` throughput as the number of worker threads grows.
+
+    Parameters:
+    - worker_counts (tuple): Worker counts to measure.
+    - records (int): Number of records encrypted per run.
+    - record_size (int): Size of each record in characters.
+    - batch_size (int): Records per task.
+
+    Returns:
+    - dict: Mapping of worker count to records per second.
+    """
+    encryption = Encryption("benchmark-passphrase")
+    plaintexts = [f"{i:08d}".ljust(record_size, "x") for i in range(records)]
+    results = {}
+    for workers in worker_counts:
+        start = time.perf_counter()
+        encryption.encrypt_many(plaintexts, workers=workers, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        results[workers] = records / elapsed
+        print(f"workers={workers:<3} {results[workers]:>12,.0f} records/s")
+    return results
+
 # Example usage:
 if __name__ == "__main__":
     passphrase = "my_strong_password123"
@@ -53,3 +466,33 @@ if __name__ == "__main__":
     decrypted_data = encryption.decrypt(encrypted_data)
     print("Decrypted Data:", decrypted_data)
 
+    # A second instance for the same passphrase reuses the cached key instead of rerunning PBKDF2
+    derivations = default_key_manager.derivations
+    per_request = Encryption(passphrase)
+    assert per_request.salt == encryption.salt and default_key_manager.derivations == derivations
+    print("Decrypted by a new instance:", per_request.decrypt(encrypted_data))
+    print("Cached derived keys:", len(default_key_manager), "from", default_key_manager.derivations, "derivation(s)")
+
+    # A forged header cannot make decryption run PBKDF2 with an arbitrary iteration count
+    forged = encrypted_data[:len(MAGIC)] + struct.pack('>I', 2 ** 31) + encrypted_data[len(MAGIC) + 4:]
+    try:
+        encryption.decrypt(forged)
+    except ValueError as error:
+        print("Forged header rejected:", error)
+
+    # Streaming encryption of a telemetry archive with constant memory
+    import io
+    archive = io.BytesIO(bytes(range(256)) * 16384)
+    encrypted_archive = io.BytesIO()
+    encryption.encrypt_stream(archive, encrypted_archive)
+    encrypted_archive.seek(0)
+    restored_archive = io.BytesIO()
+    encryption.decrypt_stream(encrypted_archive, restored_archive)
+    print("Archive restored intact:", restored_archive.getvalue() == archive.getvalue())
+
+    # Bulk encryption of nightly archive records across worker threads
+    records = [f"telemetry frame {i}" for i in range(1000)]
+    encrypted_records = encryption.encrypt_many(records, workers=4)
+    print("Bulk round trip intact:", encryption.decrypt_many(encrypted_records, workers=4) == records)
+    benchmark_bulk_encryption(worker_counts=(1, 2, 4), records=5000)
+    default_key_manager.clear()
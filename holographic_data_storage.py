@@ -1,34 +1,65 @@
 # holographic_data_storage.py - Holographic Data Storage Module
 
+from caching import CacheTier
+from database import LogStructuredStore
+from instrumentation import get_event_logger
+
+_events = get_event_logger("holographic_data_storage")
+
+# Sentinel for cache misses, since None is a valid hologram payload
+_MISSING = object()
+
 class HolographicDataStorage:
-    def __init__(self):
-        self.hologram_capacity = 0
-        self.hologram_data = {}
+    def __init__(self, cache=None, backing_store=None):
+        """
+        Initialize the holographic data storage.
+
+        Parameters:
+        - cache (CacheTier, optional): Bounded cache serving hot holograms from memory.
+        - backing_store (MutableMapping, optional): Store holding every hologram, such as a
+          database.LogStructuredStore so cold holograms live on disk. Defaults to a dict.
+        """
+        self.hologram_data = {} if backing_store is None else backing_store
+        self.hologram_capacity = len(self.hologram_data)
+        self.cache = cache
 
     def create_hologram(self, data, hologram_id):
         # Placeholder for creating a hologram from data
-        print(f"Creating a hologram with ID {hologram_id}.")
+        _events.info("create", "Creating a hologram with ID %(hologram_id)s.", hologram_id=hologram_id)
+        if hologram_id not in self.hologram_data:
+            self.hologram_capacity += 1
         self.hologram_data[hologram_id] = data
-        self.hologram_capacity += 1
-        print(f"Hologram {hologram_id} created and stored.")
+        if self.cache is not None:
+            self.cache.invalidate(hologram_id)
+        _events.info("created", "Hologram %(hologram_id)s created and stored.", hologram_id=hologram_id)
 
     def retrieve_hologram(self, hologram_id):
         # Placeholder for retrieving data from a hologram
+        if self.cache is not None:
+            data = self.cache.get(hologram_id, _MISSING)
+            if data is not _MISSING:
+                _events.info("retrieve", "Retrieving data from hologram %(hologram_id)s.", hologram_id=hologram_id)
+                return data
         if hologram_id in self.hologram_data:
-            print(f"Retrieving data from hologram {hologram_id}.")
-            return self.hologram_data[hologram_id]
+            _events.info("retrieve", "Retrieving data from hologram %(hologram_id)s.", hologram_id=hologram_id)
+            data = self.hologram_data[hologram_id]
+            if self.cache is not None:
+                self.cache.put(hologram_id, data)
+            return data
         else:
-            print(f"Error: Hologram {hologram_id} does not exist.")
+            _events.warning("not_found", "Error: Hologram %(hologram_id)s does not exist.", hologram_id=hologram_id)
 
     def delete_hologram(self, hologram_id):
         # Placeholder for deleting a hologram
         if hologram_id in self.hologram_data:
-            print(f"Deleting hologram {hologram_id}.")
+            _events.info("delete", "Deleting hologram %(hologram_id)s.", hologram_id=hologram_id)
             del self.hologram_data[hologram_id]
+            if self.cache is not None:
+                self.cache.invalidate(hologram_id)
             self.hologram_capacity -= 1
-            print(f"Hologram {hologram_id} deleted.")
+            _events.info("deleted", "Hologram %(hologram_id)s deleted.", hologram_id=hologram_id)
         else:
-            print(f"Error: Hologram {hologram_id} does not exist.")
+            _events.warning("not_found", "Error: Hologram %(hologram_id)s does not exist.", hologram_id=hologram_id)
 
 # Example usage:
 if __name__ == "__main__":
@@ -46,3 +77,14 @@ if __name__ == "__main__":
 
     # Delete a hologram from storage
     holographic_storage.delete_hologram(hologram_id)
+
+    # Keep hot holograms cached while cold ones spill to an on-disk log
+    tiered_storage = HolographicDataStorage(
+        cache=CacheTier(max_entries=128, policy="lfu"),
+        backing_store=LogStructuredStore("holograms.log"),
+    )
+    tiered_storage.create_hologram(data_to_store, hologram_id)
+    tiered_storage.retrieve_hologram(hologram_id)
+    tiered_storage.retrieve_hologram(hologram_id)
+    print(f"Hologram cache stats: {tiered_storage.cache.stats()}")
+    tiered_storage.hologram_data.close()
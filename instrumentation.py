@@ -0,0 +1,183 @@
+# instrumentation.py - Instrumentation Module
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from contextlib import contextmanager
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+_ROOT_LOGGER = logging.getLogger("talon")
+
+# Global kill switch checked before anything else, so disabled events cost one comparison
+_enabled = True
+_listener = None
+
+
+class _StdoutHandler(logging.StreamHandler):
+    # Always writes to the current sys.stdout so redirection keeps working
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    # Hand the raw record to the sink thread; formatting happens there, not on the caller
+    def prepare(self, record):
+        return record
+
+
+class StructuredFormatter(logging.Formatter):
+    """Format events as one JSON object per line with the event name and fields."""
+
+    def format(self, record):
+        event = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "component": getattr(record, "component", record.name),
+            "event": getattr(record, "event", None),
+            "message": record.getMessage(),
+        }
+        event.update(getattr(record, "fields", {}))
+        return json.dumps(event, default=repr)
+
+
+class EventLogger:
+    """
+    Level-gated emitter of structured events for one TALON component.
+
+    Messages are %-style templates filled from the event fields, e.g.
+    ``"Data with key '%(key)s' was stored."``. Nothing is formatted unless
+    the event passes the level gate, and nothing at all happens while
+    instrumentation is disabled.
+
+    Parameters:
+    - component (str): Component name, used as the ``talon.<component>`` logger name.
+    """
+
+    __slots__ = ("component", "_logger")
+
+    def __init__(self, component):
+        self.component = component
+        self._logger = logging.getLogger(f"talon.{component}")
+
+    def enabled_for(self, level):
+        """Return True when an event at ``level`` would be emitted."""
+        return _enabled and self._logger.isEnabledFor(level)
+
+    def emit(self, level, event, message, **fields):
+        """
+        Emit a structured event.
+
+        Parameters:
+        - level (int): Logging level of the event.
+        - event (str): Short machine-readable event name.
+        - message (str): %-style template formatted from ``fields`` when emitted.
+        - fields: Structured event fields.
+        """
+        if not _enabled or not self._logger.isEnabledFor(level):
+            return
+        args = (fields,) if fields else ()
+        extra = {"component": self.component, "event": event, "fields": fields}
+        self._logger.log(level, message, *args, extra=extra)
+
+    def debug(self, event, message, **fields):
+        self.emit(DEBUG, event, message, **fields)
+
+    def info(self, event, message, **fields):
+        self.emit(INFO, event, message, **fields)
+
+    def warning(self, event, message, **fields):
+        self.emit(WARNING, event, message, **fields)
+
+    def error(self, event, message, **fields):
+        self.emit(ERROR, event, message, **fields)
+
+
+def get_event_logger(component):
+    """Return the event logger for ``component``."""
+    return EventLogger(component)
+
+
+def configure(enabled=True, level=INFO, handler=None, structured=False, async_sink=False):
+    """
+    Configure how TALON service events are reported.
+
+    By default events are printed to stdout as plain messages, matching the
+    console output of the services.
+
+    Parameters:
+    - enabled (bool): False turns every event into a no-op.
+    - level (int): Minimum level of emitted events.
+    - handler (logging.Handler, optional): Destination for events. Defaults to stdout.
+    - structured (bool): Format events as JSON lines instead of plain messages.
+    - async_sink (bool): Deliver events from a background thread so callers only pay an enqueue.
+    """
+    global _enabled, _listener
+    shutdown()
+    _enabled = enabled
+    _ROOT_LOGGER.setLevel(level)
+    _ROOT_LOGGER.propagate = False
+    for existing in list(_ROOT_LOGGER.handlers):
+        _ROOT_LOGGER.removeHandler(existing)
+
+    sink = handler if handler is not None else _StdoutHandler()
+    sink.setFormatter(StructuredFormatter() if structured else logging.Formatter("%(message)s"))
+    if async_sink:
+        events = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(events, sink, respect_handler_level=True)
+        _listener.start()
+        _ROOT_LOGGER.addHandler(_LazyQueueHandler(events))
+    else:
+        _ROOT_LOGGER.addHandler(sink)
+
+
+def shutdown():
+    """Drain and stop the asynchronous sink, if one is running."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def is_enabled():
+    """Return True when instrumentation is enabled."""
+    return _enabled
+
+
+@contextmanager
+def silenced():
+    """Temporarily disable all events, e.g. while benchmarking."""
+    global _enabled
+    previous = _enabled
+    _enabled = False
+    try:
+        yield
+    finally:
+        _enabled = previous
+
+
+configure()
+
+# Example usage:
+if __name__ == "__main__":
+    events = get_event_logger("example")
+    events.info("startup", "Component %(name)s started.", name="TALON")
+
+    # Structured JSON events delivered from a background thread
+    configure(structured=True, async_sink=True)
+    events.info("telemetry", "Received %(count)d telemetry frames.", count=42, source="DSN")
+    shutdown()
+
+    # Silent mode: events become no-ops
+    configure(enabled=False)
+    events.info("telemetry", "This event is never formatted.", count=0)
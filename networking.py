@@ -1,5 +1,9 @@
 # networking.py - Networking Module
 
+from instrumentation import INFO, get_event_logger
+
+_events = get_event_logger("networking")
+
 class Networking:
     def __init__(self):
         self.connected_devices = []
@@ -8,26 +12,28 @@ class Networking:
         # Placeholder for connecting a device to the network
         if device_name not in self.connected_devices:
             self.connected_devices.append(device_name)
-            print(f"{device_name} is now connected to the network.")
+            _events.info("connected", "%(device_name)s is now connected to the network.", device_name=device_name)
         else:
-            print(f"{device_name} is already connected to the network.")
+            _events.info("already_connected", "%(device_name)s is already connected to the network.", device_name=device_name)
 
     def disconnect_device(self, device_name):
         # Placeholder for disconnecting a device from the network
         if device_name in self.connected_devices:
             self.connected_devices.remove(device_name)
-            print(f"{device_name} has been disconnected from the network.")
+            _events.info("disconnected", "%(device_name)s has been disconnected from the network.", device_name=device_name)
         else:
-            print(f"{device_name} is not connected to the network.")
+            _events.info("not_connected", "%(device_name)s is not connected to the network.", device_name=device_name)
 
     def list_connected_devices(self):
         # Placeholder for listing all connected devices
+        if not _events.enabled_for(INFO):
+            return
         if self.connected_devices:
-            print("Connected Devices:")
-            for device in self.connected_devices:
-                print(f"- {device}")
+            listing = "\n".join(f"- {device}" for device in self.connected_devices)
+            _events.info("devices", "Connected Devices:\n%(listing)s", listing=listing,
+                         devices=list(self.connected_devices))
         else:
-            print("No devices are currently connected to the network.")
+            _events.info("devices", "No devices are currently connected to the network.", devices=[])
 
 # Example usage:
 if __name__ == "__main__":
@@ -2,9 +2,11 @@
 
 # Import necessary libraries
 import numpy as np
-from qiskit import QuantumCircuit, Aer, execute
+from qiskit import QuantumCircuit
 from qiskit.visualization import plot_histogram
 
+from quantum_execution import default_service
+
 # Define quantum consciousness functions
 
 def prepare_conscious_state():
@@ -35,8 +37,7 @@ def measure_consciousness_state(conscious_circuit, shots=1):
         dict: Measurement results of the conscious state.
     """
     # Measure the conscious state to obtain classical information.
-    backend = Aer.get_backend('qasm_simulator')
-    result = execute(conscious_circuit, backend=backend, shots=shots).result()
+    result = default_service.run(conscious_circuit, 'qasm_simulator', shots=shots).result()
     counts = result.get_counts(conscious_circuit)
     return counts
 
@@ -69,9 +70,8 @@ def explore_consciousness():
     experiment_circuit.measure([0, 1], [0, 1])
 
     # Execute the experiment circuit on a quantum simulator with a larger number of shots
-    simulator = Aer.get_backend('qasm_simulator')
     shots = 1000  # Increase the number of shots for better statistical results
-    result = execute(experiment_circuit, backend=simulator, shots=shots).result()
+    result = default_service.run(experiment_circuit, 'qasm_simulator', shots=shots).result()
     measurement_results = result.get_counts(experiment_circuit)
 
     # Analyze the measurement results and derive insights related to quantum consciousness
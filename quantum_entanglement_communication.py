@@ -1,7 +1,9 @@
 # Import Qiskit, Cirq, and other quantum circuit repositories
-from qiskit import Aer, execute, QuantumCircuit, QuantumRegister, ClassicalRegister
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
 import cirq
 
+from quantum_execution import default_service
+
 class QuantumCommunicationSystem:
     def __init__(self):
         self.sender = "TALON-Sender"
@@ -14,7 +16,7 @@ class QuantumCommunicationSystem:
     def initialize_quantum_backend(self):
         """Initialize quantum backends for actual quantum operations."""
         # Choose specific quantum backends for Qiskit and Cirq
-        self.qiskit_backend = Aer.get_backend('qasm_simulator')
+        self.qiskit_backend = default_service.get_backend('qasm_simulator')
         self.cirq_simulator = cirq.Simulator()
 
     def create_entangled_pair_qiskit(self):
@@ -37,7 +39,7 @@ class QuantumCommunicationSystem:
         qc.h(qr[1])
         qc.measure(qr, cr)
 
-        job = execute(qc, self.qiskit_backend, shots=1)
+        job = default_service.run(qc, self.qiskit_backend, shots=1)
         result = job.result()
         counts = result.get_counts(qc)
 
@@ -91,7 +93,7 @@ class QuantumCommunicationSystem:
 
             qc.measure(qr, cr)
 
-            job = execute(qc, self.qiskit_backend, shots=1)
+            job = default_service.run(qc, self.qiskit_backend, shots=1)
             result = job.result()
             counts = result.get_counts(qc)
 
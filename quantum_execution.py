@@ -0,0 +1,311 @@
+# quantum_execution.py - Quantum Execution Module
+
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+from qiskit import Aer, QuantumCircuit, transpile
+from qiskit.circuit.library.standard_gates import get_standard_gate_name_mapping
+from qiskit.providers import JobStatus
+from qiskit.result import Result
+
+from stabilizer_simulator import NotCliffordError, compile_clifford, counts_from_samples, sample_clifford
+
+# Instructions fully described by their name, parameters and operands
+_LEAF_INSTRUCTIONS = set(get_standard_gate_name_mapping()) | {"initialize", "barrier", "delay", "snapshot"}
+
+# Ideal sampling simulators whose results the stabilizer fast path reproduces exactly
+_CLIFFORD_BACKENDS = {"qasm_simulator", "aer_simulator", "aer_simulator_stabilizer"}
+# Simulation methods that model the circuit exactly, like the stabilizer fast path
+_EXACT_METHODS = {None, "automatic", "stabilizer", "statevector", "density_matrix", "matrix_product_state"}
+
+
+def _backend_name(backend):
+    # BackendV1 exposes name() as a method, BackendV2 as an attribute
+    name = backend.name
+    return name if isinstance(name, str) else name()
+
+
+def _hash_circuit(circuit, digest):
+    digest.update(repr((circuit.num_qubits, circuit.num_clbits, str(circuit.global_phase))).encode())
+    digest.update(repr([(register.name, register.size) for register in circuit.qregs + circuit.cregs]).encode())
+    for instruction in circuit.data:
+        operation = instruction.operation
+        qubits = tuple(circuit.find_bit(qubit).index for qubit in instruction.qubits)
+        clbits = tuple(circuit.find_bit(clbit).index for clbit in instruction.clbits)
+        condition = getattr(operation, "condition", None)
+        if condition is not None:
+            target, value = condition
+            target = target.name if hasattr(target, "name") else circuit.find_bit(target).index
+            condition = (target, value)
+        params = tuple(str(param) for param in operation.params)
+        digest.update(repr((operation.name, params, qubits, clbits, condition)).encode())
+        # Custom gates share names freely, so their bodies are part of the structure
+        if operation.name not in _LEAF_INSTRUCTIONS and getattr(operation, "definition", None) is not None:
+            _hash_circuit(operation.definition, digest)
+
+
+def structural_hash(circuit):
+    """
+    Return a digest identifying a circuit by its structure, not its identity or name.
+
+    Two circuits with the same registers, global phase and sequence of
+    instructions, including parameters, operands and classical conditions,
+    hash equal even when built separately.
+
+    Parameters:
+    - circuit (QuantumCircuit): The circuit to hash.
+
+    Returns:
+    - str: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    _hash_circuit(circuit, digest)
+    return digest.hexdigest()
+
+
+class _CompletedJob:
+    # Minimal job interface for results computed synchronously in-process
+    def __init__(self, result):
+        self._result = result
+
+    def job_id(self):
+        return self._result.job_id
+
+    def status(self):
+        return JobStatus.DONE
+
+    def done(self):
+        return True
+
+    def result(self, timeout=None):
+        return self._result
+
+
+def _clifford_result(circuits, programs, backend_name, shots, memory, seed=None):
+    # One generator for the whole batch, so circuits never share random streams
+    rng = np.random.default_rng(seed)
+    results = []
+    for circuit, operations in zip(circuits, programs):
+        samples = sample_clifford(circuit, shots, seed=rng, operations=operations)
+        counts, shot_memory = counts_from_samples(samples, memory=memory)
+        data = {"counts": counts}
+        if memory:
+            data["memory"] = shot_memory
+        results.append({
+            "shots": shots,
+            "success": True,
+            "data": data,
+            "header": {
+                "name": circuit.name,
+                "creg_sizes": [[register.name, register.size] for register in circuit.cregs],
+                "memory_slots": circuit.num_clbits,
+            },
+        })
+    job_id = str(uuid.uuid4())
+    return Result.from_dict({
+        "backend_name": backend_name,
+        "backend_version": "stabilizer",
+        "qobj_id": job_id,
+        "job_id": job_id,
+        "success": True,
+        "results": results,
+    })
+
+
+class QuantumExecutionService:
+    """
+    Shared execution service for Qiskit circuits.
+
+    Backend instances are created once per name and then reused. Transpiled
+    circuits are cached by (backend, optimization level, structural hash), in
+    least-recently-used order, so repeated workloads skip re-transpilation even
+    when each call builds a fresh circuit object. ``run`` accepts a single
+    circuit or a batch and submits a batch as one job. The service is
+    thread-safe.
+
+    When every circuit in a batch is Clifford (H, S, CX and friends, with
+    measurements) and runs on an ideal simulator, with no noise model and an
+    exact simulation method, ``run`` samples it with the stabilizer fast path
+    instead: no transpilation, no simulator job, and a cost polynomial in the
+    qubit count. The returned job and result behave like Aer's.
+
+    Parameters:
+    - max_cached_circuits (int): Maximum number of transpiled circuits kept.
+    - optimization_level (int): Transpiler optimization level.
+    - clifford_fast_path (bool): Sample Clifford circuits analytically.
+    """
+
+    def __init__(self, max_cached_circuits=1024, optimization_level=1, clifford_fast_path=True):
+        self.max_cached_circuits = max_cached_circuits
+        self.optimization_level = optimization_level
+        self.clifford_fast_path = clifford_fast_path
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.fast_path_runs = 0
+        self._backends = {}
+        self._transpiled = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_backend(self, name="qasm_simulator"):
+        """Return the pooled Aer backend called ``name``, creating it on first use."""
+        with self._lock:
+            backend = self._backends.get(name)
+            if backend is None:
+                backend = self._backends[name] = Aer.get_backend(name)
+            return backend
+
+    def _resolve(self, backend):
+        return self.get_backend(backend) if isinstance(backend, str) else backend
+
+    def transpile(self, circuits, backend="qasm_simulator"):
+        """
+        Transpile circuits for ``backend``, reusing cached results for structurally identical circuits.
+
+        Parameters:
+        - circuits (QuantumCircuit or list): Circuit or circuits to transpile.
+        - backend (str or Backend): Backend name or instance.
+
+        Returns:
+        - QuantumCircuit or list: Transpiled circuit(s), named after their inputs.
+        """
+        backend = self._resolve(backend)
+        single = isinstance(circuits, QuantumCircuit)
+        circuits = [circuits] if single else list(circuits)
+        backend_name = _backend_name(backend)
+        keys = [(backend_name, self.optimization_level, structural_hash(circuit)) for circuit in circuits]
+
+        transpiled = [None] * len(circuits)
+        missing = {}
+        with self._lock:
+            for index, key in enumerate(keys):
+                cached = self._transpiled.get(key)
+                if cached is not None:
+                    self._transpiled.move_to_end(key)
+                    self.cache_hits += 1
+                    transpiled[index] = cached
+                else:
+                    self.cache_misses += 1
+                    missing.setdefault(key, []).append(index)
+
+        if missing:
+            # One transpile call for every distinct uncached circuit in the batch
+            compiled = transpile([circuits[indices[0]] for indices in missing.values()], backend,
+                                 optimization_level=self.optimization_level)
+            with self._lock:
+                for (key, indices), circuit in zip(missing.items(), compiled):
+                    self._transpiled[key] = circuit
+                    for index in indices:
+                        transpiled[index] = circuit
+                while len(self._transpiled) > self.max_cached_circuits:
+                    self._transpiled.popitem(last=False)
+
+        # Results are looked up by circuit name, so cached entries take the caller's name
+        for index, circuit in enumerate(circuits):
+            if transpiled[index].name != circuit.name:
+                transpiled[index] = transpiled[index].copy(name=circuit.name)
+        return transpiled[0] if single else transpiled
+
+    def run(self, circuits, backend="qasm_simulator", shots=1024, memory=False, **run_options):
+        """
+        Transpile (through the cache) and run one circuit or a batch of circuits as a single job.
+
+        Parameters:
+        - circuits (QuantumCircuit or list): Circuit or circuits to run.
+        - backend (str or Backend): Backend name or instance.
+        - shots (int): Number of shots per circuit.
+        - memory (bool): Keep per-shot measurement outcomes.
+        - run_options: Further backend run options, e.g. ``method``.
+
+        Returns:
+        - Job: The submitted job. Counts can be read with the original circuits.
+        """
+        backend = self._resolve(backend)
+        batch = [circuits] if isinstance(circuits, QuantumCircuit) else list(circuits)
+        programs = self._clifford_programs(batch, backend, run_options)
+        if programs is not None:
+            with self._lock:
+                self.fast_path_runs += 1
+            return _CompletedJob(_clifford_result(batch, programs, _backend_name(backend), shots, memory,
+                                                  seed=run_options.get("seed_simulator")))
+        return backend.run(self.transpile(circuits, backend), shots=shots, memory=memory, **run_options)
+
+    def _clifford_programs(self, circuits, backend, run_options):
+        # Compiled stabilizer programs for the batch, or None when it must run on the backend
+        if not self.clifford_fast_path or _backend_name(backend) not in _CLIFFORD_BACKENDS:
+            return None
+        # Options that change the simulation itself (noise, method, ...) need the real backend,
+        # whether passed to this call or configured on the backend instance
+        if set(run_options) - {"seed_simulator"}:
+            return None
+        options = getattr(backend, "options", None)
+        if getattr(options, "noise_model", None) is not None or getattr(options, "method", None) not in _EXACT_METHODS:
+            return None
+        programs = []
+        for circuit in circuits:
+            if not circuit.num_clbits:
+                return None
+            try:
+                programs.append(compile_clifford(circuit))
+            except NotCliffordError:
+                return None
+        return programs
+
+    def stats(self):
+        """
+        Return cache and pool counters.
+
+        Returns:
+        - dict: Transpile cache hits, misses, cached circuit count, fast path runs and pooled backend names.
+        """
+        with self._lock:
+            return {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "fast_path_runs": self.fast_path_runs,
+                "cached_circuits": len(self._transpiled),
+                "backends": sorted(self._backends),
+            }
+
+    def clear(self):
+        """Drop cached transpiled circuits and pooled backends."""
+        with self._lock:
+            self._transpiled.clear()
+            self._backends.clear()
+
+
+default_service = QuantumExecutionService()
+
+# Example usage:
+if __name__ == "__main__":
+    service = QuantumExecutionService(clifford_fast_path=False)
+
+    def bell_circuit():
+        circuit = QuantumCircuit(2, 2, name="bell")
+        circuit.h(0)
+        circuit.cx(0, 1)
+        circuit.measure([0, 1], [0, 1])
+        return circuit
+
+    # Every call builds a fresh circuit, but only the first one is transpiled
+    for _ in range(10):
+        counts = service.run(bell_circuit(), shots=256).result().get_counts()
+    print("Bell counts:", counts)
+
+    # A batch of circuits runs as one job
+    batch = [bell_circuit() for _ in range(4)]
+    result = service.run(batch, shots=128).result()
+    print("Batch counts:", [result.get_counts(index) for index in range(len(batch))])
+    print("Service stats:", service.stats())
+
+    # Clifford circuits far too wide for a state vector are sampled analytically
+    service = QuantumExecutionService()
+    ghz = QuantumCircuit(200, 200, name="ghz")
+    ghz.h(0)
+    for qubit in range(199):
+        ghz.cx(qubit, qubit + 1)
+    ghz.measure(range(200), range(200))
+    print("GHZ(200) outcomes:", len(service.run(ghz, shots=1000).result().get_counts()))
+    print("Service stats:", service.stats())
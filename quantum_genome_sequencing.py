@@ -14,7 +14,9 @@
 # Import necessary libraries
 import numpy as np
 import qiskit
-from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, Aer, execute
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+
+from quantum_execution import default_service
 
 # Define quantum genome sequencing functions
 
@@ -65,15 +67,13 @@ def quantum_genome_alignment(reference_genome, target_genome):
     return alignment_result
 
 def error_detection(quantum_data):
-    from qiskit import Aer, execute
     from qiskit.circuit.library import Repeated
     from qiskit.quantum_info import state_fidelity
 
     # Convert quantum data into a quantum state (superposition of 0 and 1)
     num_qubits = len(quantum_data)
     circuit = Repeated(num_qubits, 1)
-    backend = Aer.get_backend('statevector_simulator')
-    job = execute(circuit, backend)
+    job = default_service.run(circuit, 'statevector_simulator')
     quantum_state = job.result().get_statevector(circuit)
 
     # Calculate fidelity with the reference state (|0>)
@@ -169,8 +169,7 @@ def frame_skipping(quantum_data):
         qc.measure(qreg, creg)
 
         # Execute the circuit on a simulator
-        simulator = Aer.get_backend('qasm_simulator')
-        result = execute(qc, backend=simulator, shots=1).result()
+        result = default_service.run(qc, 'qasm_simulator', shots=1).result()
 
         # Check if the measurement outcome indicates errors
         measurement = result.get_counts(qc)
@@ -182,7 +181,6 @@ def frame_skipping(quantum_data):
 
     return processed_quantum_data
 
-from qiskit import Aer, execute
 import numpy as np
 
 def error_mitigation(quantum_data):
@@ -201,7 +199,7 @@ def error_mitigation(quantum_data):
 
     # Iterate through different noise levels and perform ZNE
     for noise_level in noise_levels:
-        simulator = Aer.get_backend('qasm_simulator')
+        simulator = default_service.get_backend('qasm_simulator')
         mitigated_result = np.zeros_like(quantum_data)
 
         for i in range(num_shots):
@@ -234,7 +232,7 @@ def execute_quantum_circuit(quantum_data, simulator):
     for i in range(num_qubits):
         qc.measure(i, i)
 
-    result = execute(qc, backend=simulator, shots=1).result().get_counts(qc)
+    result = default_service.run(qc, simulator, shots=1).result().get_counts(qc)
     return result
 
 # Example usage:
@@ -331,8 +329,7 @@ def create_entangled_state(qubits):
     circuit.measure(qreg, creg)
 
     # Simulate the circuit to get the entangled state
-    simulator = Aer.get_backend('statevector_simulator')
-    result = execute(circuit, simulator).result()
+    result = default_service.run(circuit, 'statevector_simulator').result()
     entangled_state = result.get_statevector(circuit)
 
     return circuit, entangled_state
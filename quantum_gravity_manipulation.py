@@ -2,7 +2,9 @@
 
 # Import necessary libraries
 import numpy as np
-from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, Aer, execute
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+
+from quantum_execution import default_service
 
 # Define quantum gravity manipulation functions
 
@@ -39,8 +41,7 @@ def simulate_gravity_manipulation(quantum_system, gravitons, advanced_operations
     gravity_manipulation_circuit.measure_all()
 
     # Execute the gravity manipulation circuit on a simulator
-    simulator = Aer.get_backend('qasm_simulator')
-    result = execute(gravity_manipulation_circuit, backend=simulator, shots=1).result()
+    result = default_service.run(gravity_manipulation_circuit, 'qasm_simulator', shots=1).result()
 
     # Get the manipulated state from the simulation result
     manipulated_state = result.get_counts(gravity_manipulation_circuit)
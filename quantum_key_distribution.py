@@ -1,10 +1,410 @@
 # quantum_key_distribution.py - Quantum Key Distribution Module
 
-import random
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+# Above this error rate BB84 can no longer distill a secure key
+QBER_ABORT_THRESHOLD = 0.11
+
+BB84Result = namedtuple("BB84Result", ["key", "qber", "sifted_bits", "leaked_bits", "residual_errors", "aborted"])
+
+
+def _bits_to_str(bits):
+    return (bits + ord('0')).astype(np.uint8).tobytes().decode('ascii')
+
+
+def _str_to_bits(key):
+    return np.frombuffer(key.encode('ascii'), dtype=np.uint8) - ord('0')
+
+
+class PackedKey:
+    """
+    Key material stored as packed bits, eight key bits per byte.
+
+    Noise, error correction and key comparison are XORs over whole bytes
+    rather than per-character string operations.
+
+    Parameters:
+    - data (bytes): The packed bits, most significant bit first.
+    - length (int): Number of key bits; trailing padding bits in ``data`` are zero.
+    """
+
+    __slots__ = ("data", "length")
+
+    def __init__(self, data, length):
+        self.data = bytes(data)
+        self.length = length
+
+    @classmethod
+    def from_bits(cls, bits):
+        """Pack a NumPy array of 0/1 values."""
+        bits = np.asarray(bits, dtype=np.uint8)
+        return cls(np.packbits(bits).tobytes(), len(bits))
+
+    @classmethod
+    def from_str(cls, key):
+        """Pack a string of '0'/'1' characters."""
+        return cls.from_bits(_str_to_bits(key))
+
+    @classmethod
+    def random(cls, length, rng=None):
+        rng = rng if rng is not None else np.random.default_rng()
+        return cls.from_bits(rng.integers(0, 2, length, dtype=np.uint8))
+
+    def _array(self):
+        return np.frombuffer(self.data, dtype=np.uint8)
+
+    def to_bits(self):
+        """Unpack into a NumPy array of 0/1 values."""
+        return np.unpackbits(self._array(), count=self.length)
+
+    def to_str(self):
+        return _bits_to_str(self.to_bits())
+
+    def __xor__(self, other):
+        if self.length != other.length:
+            raise ValueError("Keys must have the same length.")
+        return PackedKey((self._array() ^ other._array()).tobytes(), self.length)
+
+    def with_noise(self, error_rate, rng=None):
+        """Return a copy with each bit flipped independently with probability ``error_rate``."""
+        rng = rng if rng is not None else np.random.default_rng()
+        return self ^ PackedKey.from_bits(rng.random(self.length) < error_rate)
+
+    def flip(self, positions):
+        """Return a copy with the bits at ``positions`` flipped, e.g. to apply located error corrections."""
+        mask = np.zeros(self.length, dtype=np.uint8)
+        mask[np.asarray(positions, dtype=np.int64)] ^= 1
+        return self ^ PackedKey.from_bits(mask)
+
+    def error_positions(self, other):
+        """Return the positions where this key differs from ``other``."""
+        return np.flatnonzero(np.unpackbits((self ^ other)._array(), count=self.length))
+
+    def hamming_distance(self, other):
+        return int(np.unpackbits((self ^ other)._array(), count=self.length).sum(dtype=np.int64))
+
+    def reconcile(self, reference, engine, qber, passes=4):
+        """
+        Correct this key towards ``reference`` with Cascade.
+
+        Returns:
+        - tuple: (corrected PackedKey, number of bits leaked over the public channel).
+        """
+        corrected, leaked = engine.reconcile(reference.to_bits(), self.to_bits(), qber, passes)
+        return PackedKey.from_bits(corrected), leaked
+
+    def __len__(self):
+        return self.length
+
+    def __bytes__(self):
+        return self.data
+
+    def __eq__(self, other):
+        return isinstance(other, PackedKey) and self.length == other.length and self.data == other.data
+
+    def __hash__(self):
+        return hash((self.data, self.length))
+
+    def __repr__(self):
+        return f"PackedKey(length={self.length})"
+
+
+def binary_entropy(p):
+    """Return the binary Shannon entropy h(p) in bits."""
+    if p <= 0 or p >= 1:
+        return 0.0
+    return float(-p * np.log2(p) - (1 - p) * np.log2(1 - p))
+
+
+class BB84Engine:
+    """
+    Vectorized simulation of the BB84 pipeline on NumPy bit arrays.
+
+    Each stage (state preparation, measurement, sifting, QBER estimation,
+    Cascade error correction and Toeplitz privacy amplification) is a handful
+    of array operations over the whole key, not a per-bit loop. Keys of
+    millions of bits run in a single pass. Bits are ``uint8`` arrays of 0/1
+    values.
+
+    Parameters:
+    - seed (int, optional): Seed for the random generator, for reproducible runs.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def random_bits(self, length):
+        return self.rng.integers(0, 2, length, dtype=np.uint8)
+
+    def prepare(self, pulses):
+        """
+        Choose Alice's random bits and encoding bases.
+
+        Returns:
+        - tuple: (bits, bases), with basis 0 rectilinear and 1 diagonal.
+        """
+        return self.random_bits(pulses), self.random_bits(pulses)
+
+    def measure(self, bits, bases, error_rate=0.0):
+        """
+        Measure Alice's states in Bob's random bases over a noisy channel.
+
+        A matching basis yields Alice's bit, flipped with probability
+        ``error_rate``. A mismatched basis yields a uniformly random bit.
+
+        Returns:
+        - tuple: (received bits, Bob's bases).
+        """
+        bob_bases = self.random_bits(len(bits))
+        received = np.where(bob_bases == bases, bits, self.random_bits(len(bits)))
+        received ^= (self.rng.random(len(bits)) < error_rate).astype(np.uint8)
+        return received, bob_bases
+
+    @staticmethod
+    def sift(alice_bits, alice_bases, bob_bits, bob_bases):
+        """Keep only the positions where Alice and Bob used the same basis."""
+        matching = alice_bases == bob_bases
+        return alice_bits[matching], bob_bits[matching]
+
+    def estimate_qber(self, alice_bits, bob_bits, sample_fraction=0.1):
+        """
+        Estimate the quantum bit error rate from a random sample disclosed over the public channel.
+
+        Returns:
+        - tuple: (estimated QBER, Alice's remaining bits, Bob's remaining bits). Sampled bits are discarded.
+        """
+        sample = self.rng.random(len(alice_bits)) < sample_fraction
+        if not sample.any():
+            return 0.0, alice_bits, bob_bits
+        qber = float(np.count_nonzero(alice_bits[sample] != bob_bits[sample]) / np.count_nonzero(sample))
+        return qber, alice_bits[~sample], bob_bits[~sample]
+
+    @staticmethod
+    def _locate_errors(alice_bits, bob_bits, order, starts, ends):
+        # BINARY search run in parallel over every block with odd parity difference
+        alice_prefix = np.concatenate(([0], np.cumsum(alice_bits[order], dtype=np.int64)))
+        bob_prefix = np.concatenate(([0], np.cumsum(bob_bits[order], dtype=np.int64)))
+        low, high = starts.copy(), ends.copy()
+        leaked = 0
+        while True:
+            active = high - low > 1
+            if not active.any():
+                return order[low], leaked
+            middle = (low + high) // 2
+            leaked += int(np.count_nonzero(active))
+            left_odd = ((alice_prefix[middle] - alice_prefix[low]) - (bob_prefix[middle] - bob_prefix[low])) & 1
+            high = np.where(active & (left_odd == 1), middle, high)
+            low = np.where(active & (left_odd == 0), middle, low)
+
+    def reconcile(self, alice_bits, bob_bits, qber, passes=4):
+        """
+        Correct Bob's key towards Alice's with the Cascade protocol.
+
+        Pass ``i`` shuffles the key with a fresh public permutation, then
+        compares the parities of blocks of ``k1 * 2**i`` bits, with
+        ``k1 = 0.73 / QBER``. Each block with a parity mismatch is binary
+        searched for one error, and all such blocks are searched in parallel.
+        After each correction, earlier passes are rechecked until every block
+        parity agrees. That recheck is Cascade's backtracking step.
+
+        Returns:
+        - tuple: (corrected copy of Bob's bits, number of bits leaked over the public channel).
+        """
+        size = len(bob_bits)
+        bob_bits = bob_bits.copy()
+        if size == 0:
+            return bob_bits, 0
+        first_block = max(1, int(0.73 / max(qber, 1e-6)))
+        layouts = []
+        leaked = 0
+        for number in range(passes):
+            order = np.arange(size) if number == 0 else self.rng.permutation(size)
+            block = min(first_block << number, size)
+            starts = np.arange(0, size, block)
+            layouts.append((order, starts, np.minimum(starts + block, size)))
+            # Alice announces each block parity once; Bob tracks his own as he corrects
+            leaked += len(starts)
+            corrected = True
+            while corrected:
+                corrected = False
+                for layout_order, layout_starts, layout_ends in layouts:
+                    alice_parity = np.add.reduceat(alice_bits[layout_order], layout_starts) & 1
+                    bob_parity = np.add.reduceat(bob_bits[layout_order], layout_starts) & 1
+                    mismatched = alice_parity != bob_parity
+                    if mismatched.any():
+                        positions, bits = self._locate_errors(
+                            alice_bits, bob_bits, layout_order, layout_starts[mismatched], layout_ends[mismatched])
+                        bob_bits[positions] ^= 1
+                        leaked += bits
+                        corrected = True
+        return bob_bits, leaked
+
+    def amplify(self, bits, output_length, seed_bits=None):
+        """
+        Compress a reconciled key with a random Toeplitz matrix (universal hashing).
+
+        The matrix-vector product over GF(2) is a convolution, computed with an
+        FFT in O(n log n) rather than O(n * m).
+
+        Parameters:
+        - bits (numpy.ndarray): The reconciled key.
+        - output_length (int): Length of the final key.
+        - seed_bits (numpy.ndarray, optional): The m + n - 1 public bits defining the matrix.
+
+        Returns:
+        - numpy.ndarray: The final key bits.
+        """
+        size = len(bits)
+        if output_length <= 0 or size == 0:
+            return np.zeros(0, dtype=np.uint8)
+        if seed_bits is None:
+            seed_bits = self.random_bits(output_length + size - 1)
+        fft_size = 1 << (output_length + 2 * size - 2).bit_length()
+        product = np.fft.irfft(np.fft.rfft(seed_bits, fft_size) * np.fft.rfft(bits, fft_size), fft_size)
+        counts = np.rint(product[size - 1:size - 1 + output_length]).astype(np.int64)
+        return (counts & 1).astype(np.uint8)
+
+    def run(self, pulses, error_rate=0.0, sample_fraction=0.1, passes=4, security_bits=64):
+        """
+        Run the full BB84 pipeline.
+
+        Parameters:
+        - pulses (int): Number of qubits Alice sends.
+        - error_rate (float): Channel bit-flip probability.
+        - sample_fraction (float): Fraction of sifted bits disclosed to estimate the QBER.
+        - passes (int): Number of Cascade passes.
+        - security_bits (int): Extra bits removed during privacy amplification.
+
+        Returns:
+        - BB84Result: The final key, the estimated QBER and per-stage statistics.
+        """
+        bits, bases = self.prepare(pulses)
+        received, bob_bases = self.measure(bits, bases, error_rate)
+        alice_bits, bob_bits = self.sift(bits, bases, received, bob_bases)
+        sifted = len(alice_bits)
+        qber, alice_bits, bob_bits = self.estimate_qber(alice_bits, bob_bits, sample_fraction)
+        if qber > QBER_ABORT_THRESHOLD:
+            return BB84Result(np.zeros(0, dtype=np.uint8), qber, sifted, 0, None, True)
+        bob_bits, leaked = self.reconcile(alice_bits, bob_bits, qber, passes)
+        residual = int(np.count_nonzero(alice_bits != bob_bits))
+        # Remove what Eve may know from the channel errors and from the reconciliation transcript
+        output_length = int(len(bob_bits) * (1 - binary_entropy(qber))) - leaked - security_bits
+        key = self.amplify(bob_bits, output_length)
+        return BB84Result(key, qber, sifted, leaked, residual, False)
+
+
+class KeyPool:
+    """
+    Background producer of QKD key material.
+
+    A worker thread keeps running the BB84 pipeline and appends the distilled
+    key bytes to a buffer until it holds ``capacity_bytes``. It then waits
+    until consumers drain the buffer below that level. Consumers draw key
+    material from the buffer without waiting for generation. Drawn bytes are
+    removed, so key material is never handed out twice. If generation fails,
+    the worker stops, and ``draw`` re-raises the error once the buffered key
+    material can no longer satisfy a request.
+
+    Parameters:
+    - engine (BB84Engine, optional): Engine used by the worker thread.
+    - pulses (int): Pulses per BB84 run.
+    - error_rate (float): Channel bit-flip probability.
+    - capacity_bytes (int): Buffer size at which the producer pauses.
+    """
+
+    def __init__(self, engine=None, pulses=1000000, error_rate=0.02, capacity_bytes=1024 * 1024):
+        self.engine = engine if engine is not None else BB84Engine()
+        self.pulses = pulses
+        self.error_rate = error_rate
+        self.capacity_bytes = capacity_bytes
+        self.runs = 0
+        self.aborted_runs = 0
+        self._buffer = bytearray()
+        self._condition = threading.Condition()
+        self._error = None
+        self._running = True
+        self._worker = threading.Thread(target=self._produce, name="qkd-key-pool", daemon=True)
+        self._worker.start()
+
+    def _produce(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: not self._running or len(self._buffer) < self.capacity_bytes)
+                if not self._running:
+                    return
+            try:
+                result = self.engine.run(self.pulses, self.error_rate)
+            except Exception as error:
+                with self._condition:
+                    self._error = error
+                    self._running = False
+                    self._condition.notify_all()
+                return
+            usable = len(result.key) - len(result.key) % 8
+            with self._condition:
+                self.runs += 1
+                self.aborted_runs += result.aborted
+                self._buffer += np.packbits(result.key[:usable]).tobytes()
+                self._condition.notify_all()
+
+    @property
+    def available_bits(self):
+        return len(self._buffer) * 8
+
+    def draw(self, bits, timeout=None):
+        """
+        Take ``bits`` bits of fresh key material from the pool.
+
+        Parameters:
+        - bits (int): Number of key bits wanted.
+        - timeout (float, optional): Seconds to wait if the pool holds too little.
+
+        Returns:
+        - PackedKey: The key, or None if the timeout expired first or the pool was closed.
+          If key generation failed and the buffer cannot cover the request, its error is raised instead.
+        """
+        size = (bits + 7) // 8
+        with self._condition:
+            if not self._condition.wait_for(lambda: len(self._buffer) >= size or not self._running, timeout):
+                return None
+            if len(self._buffer) < size:
+                if self._error is not None:
+                    raise self._error
+                return None
+            data = self._buffer[:size]
+            del self._buffer[:size]
+            self._condition.notify_all()
+        return PackedKey.from_bits(np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8), count=bits))
+
+    def close(self):
+        """Stop the producer thread."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 
 class QuantumKeyDistribution:
-    def __init__(self):
-        self.shared_key = ""
+    def __init__(self, seed=None):
+        self.packed_key = PackedKey(b"", 0)
+        self.engine = BB84Engine(seed)
+
+    @property
+    def shared_key(self):
+        return self.packed_key.to_str()
+
+    @shared_key.setter
+    def shared_key(self, key):
+        self.packed_key = PackedKey.from_str(key)
 
     def generate_key(self, length):
         """
@@ -16,8 +416,8 @@ class QuantumKeyDistribution:
         Returns:
         - str: The generated binary key.
         """
-        key = ''.join(random.choice('01') for _ in range(length))
-        self.shared_key = key
+        self.packed_key = PackedKey.from_bits(self.engine.random_bits(length))
+        return self.shared_key
 
     def apply_quantum_noise(self, error_rate):
         """
@@ -26,11 +426,24 @@ class QuantumKeyDistribution:
         Parameters:
         - error_rate (float): The probability of a bit flip due to quantum noise.
         """
-        noisy_key = ""
-        for bit in self.shared_key:
-            noisy_bit = bit if random.random() > error_rate else '1' if bit == '0' else '0'
-            noisy_key += noisy_bit
-        self.shared_key = noisy_key
+        self.packed_key = self.packed_key.with_noise(error_rate, self.engine.rng)
+
+    def distribute_key(self, pulses, error_rate=0.0, **options):
+        """
+        Establish a shared key with the full BB84 pipeline.
+
+        Parameters:
+        - pulses (int): Number of qubits sent.
+        - error_rate (float): Channel bit-flip probability.
+        - options: Further ``BB84Engine.run`` options.
+
+        Returns:
+        - BB84Result: The pipeline result. ``shared_key`` is set to the final key unless the run aborted.
+        """
+        result = self.engine.run(pulses, error_rate, **options)
+        if not result.aborted:
+            self.packed_key = PackedKey.from_bits(result.key)
+        return result
 
 # Example usage:
 if __name__ == "__main__":
@@ -43,3 +456,14 @@ if __name__ == "__main__":
     # Simulate quantum noise with an error rate of 10%
     qkd.apply_quantum_noise(0.1)
     print("Noisy Key:", qkd.shared_key)
+
+    # Full BB84 run over a noisy channel with two million pulses
+    result = qkd.distribute_key(2000000, error_rate=0.03)
+    print(f"QBER: {result.qber:.4f}, sifted bits: {result.sifted_bits}, leaked during Cascade: {result.leaked_bits}")
+    print(f"Residual errors: {result.residual_errors}, final key length: {len(result.key)}")
+    print(f"Packed key size: {len(qkd.packed_key.data)} bytes for {len(qkd.packed_key)} bits")
+
+    # Keys drawn from a background pool without waiting for a BB84 run
+    with KeyPool(pulses=200000, capacity_bytes=64 * 1024) as pool:
+        session_key = pool.draw(256, timeout=10)
+        print(f"Session key: {bytes(session_key).hex()}")
@@ -2,7 +2,9 @@
 
 # Import necessary libraries
 import numpy as np
-from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, Aer, execute
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+
+from quantum_execution import default_service
 
 # Define quantum precognition functions
 
@@ -52,8 +54,7 @@ def simulate_quantum_precognition(precognitive_qubits, future_event_qubits):
     circuit.measure(precognitive_qubits + future_event_qubits, precognitive_qubits + future_event_qubits)
 
     # Execute the circuit on a simulator to obtain the simulation result
-    simulator = Aer.get_backend('qasm_simulator')
-    result = execute(circuit, backend=simulator, shots=1).result()
+    result = default_service.run(circuit, 'qasm_simulator', shots=1).result()
 
     # Extract the measurement outcome from the simulation result
     measurement = result.get_counts(circuit)
@@ -13,14 +13,24 @@
 # quantum_remote_sensing.py
 
 # Import necessary libraries
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-from qiskit import QuantumCircuit, execute, Aer, IBMQ, transpile, assemble
-from qiskit.providers.aer import QasmSimulator
+from qiskit import QuantumCircuit, IBMQ
 from qiskit.visualization import plot_histogram
 from qiskit.tools.monitor import job_monitor
 from qiskit.ignis.mitigation.measurement import complete_meas_cal, CompleteMeasFitter
-from qiskit.ignis.mitigation import (TensoredMitigationFitter, complete_tensored_meas_cal)
+from qiskit.ignis.mitigation import (TensoredMeasFitter, complete_tensored_meas_cal)
 from qiskit.providers.ibmq import least_busy
+from instrumentation import get_event_logger
+from quantum_execution import default_service
+
+_events = get_event_logger("quantum_remote_sensing")
 
 # Load IBM Quantum Experience account if available
 try:
@@ -29,6 +39,261 @@ try:
 except Exception as e:
     print(f"Warning: {e}\nIBM Quantum Experience account not loaded. Running on local simulator.")
 
+# Qubit whose measurement carries the sensing signal
+SENSING_QUBIT = 2
+# Calibrations older than this are re-measured before use
+CALIBRATION_MAX_AGE = 6 * 3600
+CALIBRATION_SHOTS = 8192
+CALIBRATION_DIRECTORY = os.path.join(os.path.expanduser("~"), ".quantum_remote_sensing", "calibrations")
+
+def _backend_name(backend):
+    # BackendV1 exposes name() as a method, BackendV2 as an attribute
+    name = backend.name
+    return name if isinstance(name, str) else name()
+
+def _is_simulator(backend):
+    configuration = getattr(backend, "configuration", None)
+    return bool(configuration and configuration().simulator)
+
+def _backend_updated_at(backend):
+    # Hardware backends report when their device properties were last refreshed; simulators report nothing
+    try:
+        properties = backend.properties()
+    except Exception:
+        return None
+    updated = getattr(properties, "last_update_date", None)
+    return updated.timestamp() if updated is not None else None
+
+class MeasurementCalibration:
+    """
+    A measurement-error calibration for a set of qubits on one backend.
+
+    ``matrix[i, j]`` is the probability of reading ``state_labels[i]`` when
+    ``state_labels[j]`` was prepared. ``apply`` inverts it for any number of
+    count dictionaries with one matrix product against its cached
+    pseudo-inverse. Negative quasi-probabilities are clipped to zero and
+    every result is rescaled to its original shot total.
+
+    Parameters:
+    - backend_name (str): Name of the calibrated backend.
+    - qubits (tuple): Calibrated physical qubits.
+    - timestamp (float): Calibration time, in seconds since the epoch.
+    - state_labels (list): Bitstring labels indexing the matrix.
+    - matrix (numpy.ndarray): Assignment matrix, one column per prepared state.
+    """
+
+    def __init__(self, backend_name, qubits, timestamp, state_labels, matrix):
+        self.backend_name = backend_name
+        self.qubits = tuple(qubits)
+        self.timestamp = timestamp
+        self.state_labels = list(state_labels)
+        self.matrix = np.asarray(matrix, dtype=float)
+        self._label_index = {label: index for index, label in enumerate(self.state_labels)}
+        self._pseudo_inverse = None
+
+    @property
+    def key(self):
+        return (self.backend_name, self.qubits)
+
+    def age(self, now=None):
+        return (time.time() if now is None else now) - self.timestamp
+
+    def apply(self, counts):
+        """
+        Mitigate measurement errors in one or many count dictionaries.
+
+        Parameters:
+        - counts (dict or list): Counts keyed by bitstring, or a list of them.
+
+        Returns:
+        - dict or list: Mitigated counts, matching the shape of ``counts``.
+        """
+        single = isinstance(counts, dict)
+        batch = [counts] if single else list(counts)
+        if self._pseudo_inverse is None:
+            self._pseudo_inverse = np.linalg.pinv(self.matrix)
+
+        raw = np.zeros((len(self.state_labels), len(batch)))
+        for column, item in enumerate(batch):
+            for label, count in item.items():
+                index = self._label_index.get(label.replace(" ", ""))
+                if index is None:
+                    raise ValueError(f"Outcome '{label}' does not match calibrated qubits {self.qubits}.")
+                raw[index, column] = count
+
+        mitigated = self._pseudo_inverse @ raw
+        np.clip(mitigated, 0, None, out=mitigated)
+        totals = mitigated.sum(axis=0)
+        shots = raw.sum(axis=0)
+        mitigated *= np.divide(shots, totals, out=np.zeros_like(shots), where=totals > 0)
+
+        results = [{label: float(value) for label, value in zip(self.state_labels, column) if value > 0}
+                   for column in mitigated.T]
+        return results[0] if single else results
+
+    def to_dict(self):
+        return {
+            "backend_name": self.backend_name,
+            "qubits": list(self.qubits),
+            "timestamp": self.timestamp,
+            "state_labels": self.state_labels,
+            "matrix": self.matrix.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["backend_name"], data["qubits"], data["timestamp"], data["state_labels"], data["matrix"])
+
+class CalibrationStore:
+    """
+    Measurement calibrations keyed by backend name, qubit list and timestamp.
+
+    ``get_or_calibrate`` returns the newest usable calibration and only runs
+    calibration circuits when there is none. A calibration is stale when it
+    is older than ``max_age``, or when a hardware backend reports device
+    properties refreshed after it was taken. Each calibration is saved as its
+    own JSON file, written through a temporary file and ``os.replace``. Files
+    for a backend and qubit list are read on the first lookup, so later runs
+    and other processes reuse them.
+
+    Parameters:
+    - directory (str, optional): Directory for calibration files. None keeps calibrations in memory only.
+    - max_age (float): Maximum calibration age in seconds.
+    - shots (int): Shots per calibration circuit.
+    """
+
+    def __init__(self, directory=None, max_age=CALIBRATION_MAX_AGE, shots=CALIBRATION_SHOTS):
+        self.directory = directory
+        self.max_age = max_age
+        self.shots = shots
+        self._calibrations = {}
+        self._lock = threading.Lock()
+
+    def _prefix(self, backend_name, qubits):
+        safe_name = "".join(character if character.isalnum() or character in "-_" else "_" for character in backend_name)
+        return f"{safe_name}-q{'_'.join(str(qubit) for qubit in qubits)}-"
+
+    def _load(self, key):
+        calibrations = self._calibrations.get(key)
+        if calibrations is None:
+            calibrations = []
+            if self.directory is not None:
+                pattern = os.path.join(self.directory, glob.escape(self._prefix(*key)) + "*.json")
+                for path in glob.glob(pattern):
+                    with open(path) as calibration_file:
+                        calibration = MeasurementCalibration.from_dict(json.load(calibration_file))
+                    # The file name prefix can collide after sanitizing, so check the real key
+                    if calibration.key == key:
+                        calibrations.append(calibration)
+            calibrations.sort(key=lambda calibration: calibration.timestamp)
+            self._calibrations[key] = calibrations
+        return calibrations
+
+    def _save(self, calibration):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory,
+                            f"{self._prefix(*calibration.key)}{int(calibration.timestamp * 1000)}.json")
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as calibration_file:
+            json.dump(calibration.to_dict(), calibration_file)
+        os.replace(temporary_path, path)
+
+    def is_stale(self, calibration, backend=None, now=None):
+        """Return True when ``calibration`` is too old, or predates the backend's last property refresh."""
+        if calibration.age(now) > self.max_age:
+            return True
+        updated_at = _backend_updated_at(backend) if backend is not None and not _is_simulator(backend) else None
+        return updated_at is not None and updated_at > calibration.timestamp
+
+    def get(self, backend, qubits):
+        """
+        Return the newest fresh calibration for ``backend`` and ``qubits``, or None.
+
+        Parameters:
+        - backend (Backend or str): Backend instance or name. A name skips the device refresh check.
+        - qubits (list): Measured physical qubits.
+        """
+        backend_name = backend if isinstance(backend, str) else _backend_name(backend)
+        with self._lock:
+            calibrations = list(self._load((backend_name, tuple(qubits))))
+        for calibration in reversed(calibrations):
+            if not self.is_stale(calibration, None if isinstance(backend, str) else backend):
+                return calibration
+        return None
+
+    def put(self, calibration):
+        """Record ``calibration`` in memory and, when a directory is set, on disk."""
+        with self._lock:
+            calibrations = self._load(calibration.key)
+            calibrations.append(calibration)
+            calibrations.sort(key=lambda item: item.timestamp)
+            if self.directory is not None:
+                self._save(calibration)
+
+    def calibrate(self, backend, qubits):
+        """
+        Run calibration circuits on ``backend`` and store the resulting calibration.
+
+        Simulators get the complete calibration (2**n circuits). Hardware gets
+        the tensored one (2 circuits), and its per-qubit matrices are combined
+        into the full assignment matrix.
+
+        Returns:
+        - MeasurementCalibration: The new calibration.
+        """
+        qubits = tuple(qubits)
+        timestamp = time.time()
+        if _is_simulator(backend):
+            cal_circuits, state_labels = complete_meas_cal(qubit_list=list(qubits))
+            cal_results = default_service.run(cal_circuits, backend, shots=self.shots).result()
+            fitter = CompleteMeasFitter(cal_results, state_labels)
+            matrix = fitter.cal_matrix
+        else:
+            mit_pattern = [[qubit] for qubit in qubits]
+            cal_circuits, mit_pattern = complete_tensored_meas_cal(mit_pattern=mit_pattern)
+            cal_results = default_service.run(cal_circuits, backend, shots=self.shots).result()
+            fitter = TensoredMeasFitter(cal_results, mit_pattern=mit_pattern)
+            # The first qubit is the rightmost bit of a label, so its matrix is the innermost factor
+            matrix = np.ones((1, 1))
+            for qubit_matrix in fitter.cal_matrices:
+                matrix = np.kron(qubit_matrix, matrix)
+            state_labels = [format(index, f"0{len(qubits)}b") for index in range(2 ** len(qubits))]
+
+        calibration = MeasurementCalibration(_backend_name(backend), qubits, timestamp, state_labels, matrix)
+        self.put(calibration)
+        return calibration
+
+    def get_or_calibrate(self, backend, qubits):
+        """Return a fresh stored calibration, calibrating ``backend`` first when there is none."""
+        return self.get(backend, qubits) or self.calibrate(backend, qubits)
+
+    def prune(self, now=None):
+        """
+        Forget calibrations older than ``max_age`` and delete their files.
+
+        Returns:
+        - int: Number of calibrations removed from memory.
+        """
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            for key, calibrations in self._calibrations.items():
+                fresh = [calibration for calibration in calibrations if calibration.age(now) <= self.max_age]
+                removed += len(calibrations) - len(fresh)
+                self._calibrations[key] = fresh
+            if self.directory is not None:
+                for path in glob.glob(os.path.join(self.directory, "*.json")):
+                    try:
+                        with open(path) as calibration_file:
+                            timestamp = json.load(calibration_file)["timestamp"]
+                    except (OSError, ValueError, KeyError):
+                        continue
+                    if now - timestamp > self.max_age:
+                        os.remove(path)
+        return removed
+
+default_calibration_store = CalibrationStore(CALIBRATION_DIRECTORY)
+
 def initialize_sensor():
     # Code to initialize the quantum remote sensing sensor
     print("Quantum remote sensing sensor initialized.")
@@ -38,7 +303,6 @@ def calibrate_sensor():
     print("Calibrating quantum remote sensing sensor...")
 
     # Simulating the calibration process using a quantum circuit
-    backend = Aer.get_backend('statevector_simulator')
     qc = QuantumCircuit(2)
     qc.h(0)
     qc.cx(0, 1)
@@ -46,72 +310,161 @@ def calibrate_sensor():
     qc.h(1)
     qc.cx(0, 1)
     qc.h(0)
-    cal_circuit = transpile(qc, backend)
-    result = execute(cal_circuit, backend).result()
-    statevector = result.get_statevector(cal_circuit)
+    result = default_service.run(qc, 'statevector_simulator').result()
+    statevector = result.get_statevector(qc)
     print("Calibration completed successfully.")
 
-def perform_remote_sensing(target_object, use_real_quantum=False):
-    # Code to perform quantum remote sensing
-    print(f"Initiating quantum remote sensing for {target_object}...")
-
-    # Choose backend based on use_real_quantum flag
+def select_backend(use_real_quantum=False):
+    # Choose the least busy real device when requested and available, otherwise the local simulator
     if use_real_quantum:
         try:
-            backend = least_busy(provider.backends(filters=lambda x: x.configuration().n_qubits >= 3 and
-                                                           not x.configuration().simulator and x.status().operational == True))
+            return least_busy(provider.backends(filters=lambda x: x.configuration().n_qubits >= 3 and
+                                                       not x.configuration().simulator and x.status().operational == True)), True
         except Exception as e:
             print(f"Warning: {e}\nRunning on local simulator.")
-            use_real_quantum = False
-
-    if not use_real_quantum:
-        backend = QasmSimulator()
+    return default_service.get_backend('qasm_simulator'), False
 
-    qc = QuantumCircuit(3, 1)
+def build_sensing_circuit(target_object, name=None):
+    # Sensing circuit for one target; the name identifies its counts in a batched result
+    qc = QuantumCircuit(3, 1, name=name or f"sensing-{target_object}")
     qc.h(0)
     qc.cx(0, 1)
     qc.cx(1, 2)
-    qc.measure(2, 0)
-    sensing_circuit = transpile(qc, backend)
-    job = execute(sensing_circuit, backend)
+    qc.measure(SENSING_QUBIT, 0)
+    return qc
+
+def measured_qubits(circuit):
+    # Physical qubits read into each classical bit of a transpiled circuit, in classical bit order
+    qubits = {}
+    for instruction in circuit.data:
+        if instruction.operation.name == "measure":
+            qubits[circuit.find_bit(instruction.clbits[0]).index] = circuit.find_bit(instruction.qubits[0]).index
+    return tuple(qubits[clbit] for clbit in sorted(qubits))
+
+def sensing_layout(circuit, backend):
+    # The layout pass may move the sensing qubit; the service's transpile cache hands
+    # run() this same transpiled circuit, so its measured qubits are the ones to calibrate
+    return measured_qubits(default_service.transpile(circuit, backend))
+
+def strongest_signal(counts):
+    # Mitigation can clip every outcome of a noisy result to zero, leaving nothing to rank
+    return max(counts, key=counts.get) if counts else None
+
+def perform_remote_sensing(target_object, use_real_quantum=False, plot=False, store=None):
+    """
+    Run remote sensing for a single target.
+
+    Progress is reported through the module's event logger, so batch callers
+    can silence it. Nothing is plotted unless ``plot`` is set.
+
+    Parameters:
+    - target_object (str): Target object name.
+    - use_real_quantum (bool): Run on the least busy real device, if available.
+    - plot (bool): Plot the result through ``visualize_campaign_results``.
+    - store (CalibrationStore, optional): Calibration store for hardware runs.
+
+    Returns:
+    - dict: ``target``, ``counts`` and ``max_signal``, as in ``run_sensing_campaign``.
+    """
+    _events.info("sensing_started", "Initiating quantum remote sensing for %(target)s...", target=target_object)
+
+    backend, use_real_quantum = select_backend(use_real_quantum)
+
+    qc = build_sensing_circuit(target_object)
+    job = default_service.run(qc, backend)
 
     if use_real_quantum:
-        print("Job submitted to IBM Quantum Experience. Waiting for results...")
+        _events.info("job_submitted", "Job submitted to IBM Quantum Experience. Waiting for results...")
         job_monitor(job)
 
     result = job.result()
-    counts = result.get_counts(sensing_circuit)
-    print("Remote sensing completed.")
+    counts = result.get_counts(qc)
+    _events.info("sensing_completed", "Remote sensing completed.")
 
     # Analyzing the quantum sensing results
-    print("Analyzing sensing data...")
-    mitigated_counts = error_mitigation(counts, backend) if use_real_quantum else counts
-    max_signal = max(mitigated_counts, key=mitigated_counts.get)
-    print(f"Max signal state: {max_signal}")
-    visualize_sensing_results(mitigated_counts)
-
-def error_mitigation(counts, backend):
-    # Error mitigation using measurement calibration
-    print("Applying error mitigation...")
-    if backend.configuration().simulator:
-        cal_circuits, state_labels = complete_meas_cal(qubit_list=[0, 1, 2])
-        cal_job = execute(cal_circuits, backend=backend, shots=8192)
-        cal_results = cal_job.result()
-        meas_fitter = CompleteMeasFitter(cal_results, state_labels)
-        mitigated_counts = meas_fitter.filter.apply(counts)
+    if use_real_quantum:
+        counts = error_mitigation(counts, backend, qubits=sensing_layout(qc, backend), store=store)
+    sensing_result = {"target": target_object, "counts": counts, "max_signal": strongest_signal(counts)}
+    _events.info("max_signal", "Max signal state: %(state)s", state=sensing_result["max_signal"])
+    if plot:
+        visualize_campaign_results([sensing_result])
+    return sensing_result
+
+def run_sensing_campaign(targets, use_real_quantum=False, shots=1024, batch_size=500, workers=None,
+                         plot=False, store=None):
+    """
+    Run remote sensing for many targets with batched jobs.
+
+    The backend is chosen once and every circuit is built up front. Targets
+    are then submitted in batches of ``batch_size``, one job per batch, with
+    up to ``workers`` batches in flight at once. Identical circuits share one
+    transpilation through the execution service cache. On real hardware all
+    counts are mitigated together with a single stored calibration of the
+    physical qubit the transpiled circuits measure. Nothing
+    is printed or plotted per target; ``plot`` draws one histogram for the
+    whole campaign once every target has finished.
+
+    Parameters:
+    - targets (list): Target object names.
+    - use_real_quantum (bool): Run on the least busy real device, if available.
+    - shots (int): Shots per target.
+    - batch_size (int): Circuits per submitted job.
+    - workers (int, optional): Batches run concurrently. Defaults to the CPU count on simulators and 1 on hardware.
+    - plot (bool): Plot the aggregated results after the campaign.
+    - store (CalibrationStore, optional): Calibration store for hardware runs.
+
+    Returns:
+    - list: One dict per target, in input order, with ``target``, ``counts`` and ``max_signal``
+      (None when mitigation leaves no outcome).
+    """
+    targets = list(targets)
+    backend, use_real_quantum = select_backend(use_real_quantum)
+    circuits = [build_sensing_circuit(target, name=f"sensing-{index}") for index, target in enumerate(targets)]
+    batches = [circuits[start:start + batch_size] for start in range(0, len(circuits), batch_size)]
+
+    def run_batch(batch):
+        job = default_service.run(batch, backend, shots=shots)
+        if use_real_quantum:
+            job_monitor(job)
+        result = job.result()
+        return [result.get_counts(circuit) for circuit in batch]
+
+    # Hardware queues serialize jobs anyway, so only simulators default to parallel submission
+    workers = workers or (1 if use_real_quantum else os.cpu_count() or 1)
+    if workers == 1 or len(batches) <= 1:
+        counts = [item for batch_counts in map(run_batch, batches) for item in batch_counts]
     else:
-        cal_circuits, state_labels = complete_tensored_meas_cal(qubit_list=[0, 1, 2])
-        cal_job = execute(cal_circuits, backend=backend, shots=8192)
-        cal_results = cal_job.result()
-        mitigated_counts = TensoredMitigationFitter(cal_results, state_labels).filter.apply(counts)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            counts = [item for batch_counts in pool.map(run_batch, batches) for item in batch_counts]
+
+    if use_real_quantum and counts:
+        counts = error_mitigation(counts, backend, qubits=sensing_layout(circuits[0], backend), store=store)
 
-    return mitigated_counts
+    results = [{"target": target, "counts": target_counts, "max_signal": strongest_signal(target_counts)}
+               for target, target_counts in zip(targets, counts)]
+    if plot:
+        visualize_campaign_results(results)
+    return results
+
+def error_mitigation(counts, backend, qubits=(SENSING_QUBIT,), store=None):
+    # Error mitigation using a stored measurement calibration, calibrating only when none is fresh
+    store = default_calibration_store if store is None else store
+    calibration = store.get_or_calibrate(backend, qubits)
+    _events.info("error_mitigation", "Applying error mitigation with the %(backend)s calibration of qubits %(qubits)s...",
+                 backend=calibration.backend_name, qubits=list(calibration.qubits))
+    return calibration.apply(counts)
 
 def visualize_sensing_results(counts):
-    # Code to visualize the results of quantum remote sensing
-    print("Visualizing sensing results...")
-    plot_histogram(counts)
-    pass
+    # A single sensing run is plotted as a one-target campaign
+    return visualize_campaign_results([{"counts": counts}])
+
+def visualize_campaign_results(results):
+    # Aggregate a campaign's counts into one histogram instead of one plot per target
+    total_counts = {}
+    for result in results:
+        for state, count in result["counts"].items():
+            total_counts[state] = total_counts.get(state, 0) + count
+    return plot_histogram(total_counts, title=f"Remote sensing campaign ({len(results)} targets)")
 
 def main():
     # Main function to execute the quantum remote sensing process
@@ -120,7 +473,16 @@ def main():
 
     initialize_sensor()
     calibrate_sensor()
-    perform_remote_sensing(target_object, use_real_quantum)
+    sensing_result = perform_remote_sensing(target_object, use_real_quantum, plot=True)
+    print(f"Max signal state for {target_object}: {sensing_result['max_signal']}")
+
+    # Survey many targets in batched jobs
+    survey_targets = [f"Exoplanet XYZ-{number}" for number in range(1000)]
+    survey = run_sensing_campaign(survey_targets, use_real_quantum)
+    signals = {}
+    for result in survey:
+        signals[result["max_signal"]] = signals.get(result["max_signal"], 0) + 1
+    print(f"Survey of {len(survey)} targets completed. Max signal states: {signals}")
 
 if __name__ == "__main__":
     main()
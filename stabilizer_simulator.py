@@ -0,0 +1,326 @@
+# stabilizer_simulator.py - Stabilizer Simulator Module
+
+import numpy as np
+
+# Gates the tableau applies directly; anything else must decompose into these
+CLIFFORD_GATES = {"id", "x", "y", "z", "h", "s", "sdg", "sx", "sxdg", "cx", "cy", "cz", "swap"}
+PAULI_GATES = {"x", "y", "z"}
+_IGNORED = {"barrier", "delay"}
+_DEFINITION_DEPTH = 8
+
+
+class NotCliffordError(ValueError):
+    """Raised when a circuit cannot be simulated with the stabilizer tableau."""
+
+
+def _phase_exponents(x1, z1, x2, z2):
+    # Power of i picked up per qubit when Pauli (x1, z1) multiplies Pauli (x2, z2)
+    x2 = x2.astype(np.int8)
+    z2 = z2.astype(np.int8)
+    return np.where(x1 & z1, z2 - x2,
+                    np.where(x1, z2 * (2 * x2 - 1),
+                             np.where(z1, x2 * (1 - 2 * z2), 0)))
+
+
+class StabilizerTableau:
+    """
+    Aaronson-Gottesman (CHP) stabilizer tableau with symbolic phases.
+
+    Rows 0..n-1 are destabilizers and rows n..2n-1 are stabilizers. Each row's sign is an affine function over GF(2) rather than
+    a single bit. Column 0 holds the constant term, and column ``k`` holds the
+    coefficient of the ``k``-th random measurement outcome. Running a circuit
+    once therefore expresses every measurement result as an affine function of
+    independent fair coins. Any number of shots can then be sampled with one
+    GF(2) matrix product (Gottesman-Knill).
+
+    Parameters:
+    - num_qubits (int): Number of qubits, all starting in |0>.
+    - max_variables (int): Upper bound on the number of random measurement outcomes.
+    """
+
+    def __init__(self, num_qubits, max_variables):
+        n = num_qubits
+        self.num_qubits = n
+        self.x = np.zeros((2 * n, n), dtype=bool)
+        self.z = np.zeros((2 * n, n), dtype=bool)
+        self.x[np.arange(n), np.arange(n)] = True
+        self.z[n + np.arange(n), np.arange(n)] = True
+        self.r = np.zeros((2 * n, 1 + max_variables), dtype=bool)
+        self.num_variables = 0
+
+    # Single-qubit Cliffords
+
+    def h(self, a):
+        self.r[:, 0] ^= self.x[:, a] & self.z[:, a]
+        self.x[:, a], self.z[:, a] = self.z[:, a].copy(), self.x[:, a].copy()
+
+    def s(self, a):
+        self.r[:, 0] ^= self.x[:, a] & self.z[:, a]
+        self.z[:, a] ^= self.x[:, a]
+
+    def sdg(self, a):
+        self.s(a)
+        self.z_gate(a)
+
+    def sx(self, a):
+        self.h(a)
+        self.s(a)
+        self.h(a)
+
+    def sxdg(self, a):
+        self.h(a)
+        self.sdg(a)
+        self.h(a)
+
+    def pauli(self, name, a, phase=None):
+        """Apply Pauli ``name`` to qubit ``a``, optionally only when the affine condition ``phase`` is 1."""
+        if name == "x":
+            rows = self.z[:, a]
+        elif name == "z":
+            rows = self.x[:, a]
+        else:
+            rows = self.x[:, a] ^ self.z[:, a]
+        if phase is None:
+            self.r[:, 0] ^= rows
+        else:
+            self.r[rows] ^= phase
+
+    def x_gate(self, a):
+        self.pauli("x", a)
+
+    def y_gate(self, a):
+        self.pauli("y", a)
+
+    def z_gate(self, a):
+        self.pauli("z", a)
+
+    # Two-qubit Cliffords
+
+    def cx(self, a, b):
+        self.r[:, 0] ^= self.x[:, a] & self.z[:, b] & ~(self.x[:, b] ^ self.z[:, a])
+        self.x[:, b] ^= self.x[:, a]
+        self.z[:, a] ^= self.z[:, b]
+
+    def cz(self, a, b):
+        self.h(b)
+        self.cx(a, b)
+        self.h(b)
+
+    def cy(self, a, b):
+        self.sdg(b)
+        self.cx(a, b)
+        self.s(b)
+
+    def swap(self, a, b):
+        self.cx(a, b)
+        self.cx(b, a)
+        self.cx(a, b)
+
+    # Measurement
+
+    def _rowsum(self, targets, source):
+        # Multiply each target row by the source row, tracking the product's sign
+        x1, z1 = self.x[source], self.z[source]
+        g = _phase_exponents(x1, z1, self.x[targets], self.z[targets])
+        self.r[targets] ^= self.r[source]
+        self.r[targets, 0] ^= g.sum(axis=1, dtype=np.int64) % 4 == 2
+        self.x[targets] ^= x1
+        self.z[targets] ^= z1
+
+    def _product_phase(self, rows):
+        # Sign of the ordered product of commuting rows, computed for all factors at once:
+        # factor m is multiplied into the running product of factors 0..m-1
+        x1, z1 = self.x[rows], self.z[rows]
+        x2 = np.zeros_like(x1)
+        z2 = np.zeros_like(z1)
+        x2[1:] = np.bitwise_xor.accumulate(x1, axis=0)[:-1]
+        z2[1:] = np.bitwise_xor.accumulate(z1, axis=0)[:-1]
+        phase = np.bitwise_xor.reduce(self.r[rows], axis=0)
+        phase[0] ^= _phase_exponents(x1, z1, x2, z2).sum(dtype=np.int64) % 4 == 2
+        return phase
+
+    def measure(self, a):
+        """
+        Measure qubit ``a`` in the computational basis.
+
+        Returns:
+        - numpy.ndarray: The outcome as an affine function (constant, then variable coefficients).
+        """
+        n = self.num_qubits
+        anticommuting = np.flatnonzero(self.x[n:2 * n, a])
+        if anticommuting.size:
+            # Random outcome: a fresh variable
+            p = n + anticommuting[0]
+            rows = np.flatnonzero(self.x[:2 * n, a])
+            rows = rows[rows != p]
+            if rows.size:
+                self._rowsum(rows, p)
+            self.x[p - n], self.z[p - n], self.r[p - n] = self.x[p], self.z[p], self.r[p]
+            self.x[p] = False
+            self.z[p] = False
+            self.z[p, a] = True
+            self.r[p] = False
+            self.num_variables += 1
+            self.r[p, self.num_variables] = True
+            return self.r[p].copy()
+
+        # Deterministic outcome: the product of the stabilizers paired with
+        # destabilizers that anticommute with Z_a is +/-Z_a, and its sign is the outcome
+        return self._product_phase(np.flatnonzero(self.x[:n, a]) + n)
+
+    def reset(self, a):
+        """Reset qubit ``a`` to |0> by measuring it and flipping it back when the outcome is 1."""
+        self.pauli("x", a, self.measure(a))
+
+
+def _flatten(circuit, qubit_map=None, clbit_map=None, depth=0):
+    # Yield (name, qubits, clbits, condition) with custom gates expanded into their definitions
+    for instruction in circuit.data:
+        operation = instruction.operation
+        qubits = [circuit.find_bit(qubit).index for qubit in instruction.qubits]
+        clbits = [circuit.find_bit(clbit).index for clbit in instruction.clbits]
+        if qubit_map is not None:
+            qubits = [qubit_map[qubit] for qubit in qubits]
+            clbits = [clbit_map[clbit] for clbit in clbits]
+        name = operation.name
+        condition = getattr(operation, "condition", None)
+        if condition is not None and qubit_map is not None:
+            raise NotCliffordError("Classical conditions inside gate definitions are not supported.")
+        if name in CLIFFORD_GATES or name in ("measure", "reset") or name in _IGNORED:
+            yield name, qubits, clbits, condition
+        elif getattr(operation, "definition", None) is not None and depth < _DEFINITION_DEPTH and condition is None:
+            yield from _flatten(operation.definition, qubits, clbits, depth + 1)
+        else:
+            raise NotCliffordError(f"Instruction '{name}' is not a supported Clifford operation.")
+
+
+def _condition_bit(circuit, condition):
+    # Single classical bit the condition depends on, and the value it must have
+    target, value = condition
+    if hasattr(target, "size"):
+        if target.size != 1:
+            raise NotCliffordError("Conditions on multi-bit registers are not affine.")
+        target = target[0]
+    return circuit.find_bit(target).index, value
+
+
+def compile_clifford(circuit):
+    """
+    Check a circuit for the stabilizer fast path and flatten it into operations.
+
+    Supported circuits contain Clifford gates, measurements, resets and barriers,
+    plus custom gates whose definitions contain only those. Single-bit classical
+    conditions are allowed on Pauli gates.
+
+    Returns:
+    - list: Flattened (name, qubits, clbits, condition) operations.
+    """
+    operations = list(_flatten(circuit))
+    for name, _, _, condition in operations:
+        if condition is not None:
+            if name not in PAULI_GATES:
+                raise NotCliffordError(f"Classically controlled '{name}' is not supported.")
+            _condition_bit(circuit, condition)
+    return operations
+
+
+def is_clifford(circuit):
+    """Return True when ``circuit`` can run on the stabilizer simulator."""
+    try:
+        compile_clifford(circuit)
+    except NotCliffordError:
+        return False
+    return True
+
+
+def affine_outcomes(circuit, operations=None):
+    """
+    Run ``circuit`` once symbolically.
+
+    Returns:
+    - numpy.ndarray: One row per classical bit, an affine function of the random outcome variables.
+    """
+    operations = operations if operations is not None else compile_clifford(circuit)
+    max_variables = sum(name in ("measure", "reset") for name, _, _, _ in operations)
+    tableau = StabilizerTableau(circuit.num_qubits, max_variables)
+    clbits = np.zeros((circuit.num_clbits, 1 + max_variables), dtype=bool)
+    single = {"h": tableau.h, "s": tableau.s, "sdg": tableau.sdg, "sx": tableau.sx, "sxdg": tableau.sxdg}
+    double = {"cx": tableau.cx, "cy": tableau.cy, "cz": tableau.cz, "swap": tableau.swap}
+    for name, qubits, bits, condition in operations:
+        if name == "measure":
+            clbits[bits[0]] = tableau.measure(qubits[0])
+        elif name == "reset":
+            tableau.reset(qubits[0])
+        elif name in PAULI_GATES:
+            phase = None
+            if condition is not None:
+                index, value = _condition_bit(circuit, condition)
+                phase = clbits[index].copy()
+                phase[0] ^= not value
+            tableau.pauli(name, qubits[0], phase)
+        elif name in single:
+            single[name](qubits[0])
+        elif name in double:
+            double[name](qubits[0], qubits[1])
+    return clbits[:, :1 + tableau.num_variables]
+
+
+def sample_clifford(circuit, shots, seed=None, operations=None):
+    """
+    Sample measurement outcomes of a Clifford circuit.
+
+    Cost is polynomial in the number of qubits. Every shot after the symbolic
+    pass costs one GF(2) matrix-vector product.
+
+    Parameters:
+    - circuit (QuantumCircuit): A circuit accepted by ``compile_clifford``.
+    - shots (int): Number of shots.
+    - seed (int or numpy.random.Generator, optional): Seed or generator for reproducible sampling.
+    - operations (list, optional): ``compile_clifford(circuit)``, when the caller already has it.
+
+    Returns:
+    - numpy.ndarray: Boolean array of shape (shots, num_clbits); column ``i`` is classical bit ``i``.
+    """
+    outcomes = affine_outcomes(circuit, operations)
+    rng = np.random.default_rng(seed)
+    coins = rng.integers(0, 2, (shots, outcomes.shape[1] - 1), dtype=np.uint8)
+    samples = coins @ outcomes[:, 1:].T.astype(np.int64) if coins.shape[1] else np.zeros((shots, len(outcomes)), dtype=np.int64)
+    return ((samples & 1).astype(bool)) ^ outcomes[:, 0]
+
+
+def counts_from_samples(samples, memory=False):
+    """
+    Summarize sampled classical bits as hex-keyed counts, in the format of qiskit experiment data.
+
+    Returns:
+    - tuple: (counts dict, list of per-shot hex strings or None).
+    """
+    rows, inverse, frequency = np.unique(samples, axis=0, return_inverse=True, return_counts=True)
+    weights = [1 << bit for bit in range(samples.shape[1])]
+    keys = [hex(sum(weight for weight, bit in zip(weights, row) if bit)) for row in rows]
+    counts = dict(zip(keys, (int(count) for count in frequency)))
+    shot_memory = [keys[index] for index in np.ravel(inverse)] if memory else None
+    return counts, shot_memory
+
+# Example usage:
+if __name__ == "__main__":
+    import time
+    from qiskit import QuantumCircuit
+
+    # A 500-qubit GHZ state, far beyond state-vector limits
+    num_qubits = 500
+    ghz = QuantumCircuit(num_qubits, num_qubits)
+    ghz.h(0)
+    for qubit in range(num_qubits - 1):
+        ghz.cx(qubit, qubit + 1)
+    ghz.measure(range(num_qubits), range(num_qubits))
+
+    start = time.perf_counter()
+    samples = sample_clifford(ghz, shots=10000)
+    elapsed = time.perf_counter() - start
+    agreeing = np.all(samples == samples[:, :1], axis=1).mean()
+    print(f"GHZ({num_qubits}) 10000 shots in {elapsed:.2f}s; shots with all qubits agreeing: {agreeing:.0%}")
+
+    toffoli = QuantumCircuit(3)
+    toffoli.ccx(0, 1, 2)
+    print(f"GHZ circuit is Clifford: {is_clifford(ghz)}; Toffoli circuit is Clifford: {is_clifford(toffoli)}")